@@ -5,16 +5,22 @@ Layer 3 深度分析數據抓取器。
 分析師預估、持股結構等深度數據，用於投行等級分析報告。
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
+from operator import attrgetter
 from typing import Optional
 import logging
 import math
 import time
 
+import numpy as np
 import pandas as pd
 import yfinance as yf
 
+from scripts.scanner.data_fetcher import _intern
+from scripts.scanner.rate_limiter import RateLimiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,7 +28,7 @@ logger = logging.getLogger(__name__)
 # 子數據結構
 # ============================================================
 
-@dataclass
+@dataclass(slots=True, kw_only=True)
 class ValuationData:
     """T1 估值數據：倍數、分析師目標價、DCF 輸入參數。"""
 
@@ -84,6 +90,8 @@ class ValuationData:
     @classmethod
     def from_dict(cls, data: dict) -> "ValuationData":
         """從字典反序列化。"""
+        if not data:
+            return cls()
         return cls(
             ev_to_ebitda=data.get("ev_to_ebitda"),
             ev_to_revenue=data.get("ev_to_revenue"),
@@ -96,7 +104,7 @@ class ValuationData:
             target_price_high=data.get("target_price_high"),
             target_price_low=data.get("target_price_low"),
             analyst_count=data.get("analyst_count"),
-            recommendation_key=data.get("recommendation_key"),
+            recommendation_key=_intern(data.get("recommendation_key")),
             recommendation_mean=data.get("recommendation_mean"),
             recommendations_summary=data.get("recommendations_summary"),
             free_cashflow=data.get("free_cashflow"),
@@ -108,7 +116,7 @@ class ValuationData:
         )
 
 
-@dataclass
+@dataclass(slots=True, kw_only=True)
 class FinancialHealthData:
     """T2 財務體質數據：三表摘要、債務健康度。"""
 
@@ -158,6 +166,8 @@ class FinancialHealthData:
     @classmethod
     def from_dict(cls, data: dict) -> "FinancialHealthData":
         """從字典反序列化。"""
+        if not data:
+            return cls()
         return cls(
             revenue_history=data.get("revenue_history", {}),
             net_income_history=data.get("net_income_history", {}),
@@ -178,7 +188,7 @@ class FinancialHealthData:
         )
 
 
-@dataclass
+@dataclass(slots=True, kw_only=True)
 class GrowthMomentumData:
     """T3 成長動能數據：分析師預估、盈餘驚喜、成長率。"""
 
@@ -208,6 +218,8 @@ class GrowthMomentumData:
     @classmethod
     def from_dict(cls, data: dict) -> "GrowthMomentumData":
         """從字典反序列化。"""
+        if not data:
+            return cls()
         return cls(
             eps_estimates=data.get("eps_estimates", []),
             revenue_estimates=data.get("revenue_estimates", []),
@@ -218,7 +230,7 @@ class GrowthMomentumData:
         )
 
 
-@dataclass
+@dataclass(slots=True, kw_only=True)
 class RiskMetricsData:
     """T4 風險指標數據：波動性、放空、持股結構、內部交易。"""
 
@@ -263,6 +275,8 @@ class RiskMetricsData:
     @classmethod
     def from_dict(cls, data: dict) -> "RiskMetricsData":
         """從字典反序列化。"""
+        if not data:
+            return cls()
         return cls(
             beta=data.get("beta"),
             short_ratio=data.get("short_ratio"),
@@ -278,7 +292,7 @@ class RiskMetricsData:
         )
 
 
-@dataclass
+@dataclass(slots=True, kw_only=True)
 class PeerComparisonData:
     """T5 同業比較數據：同業指標清單與排名。"""
 
@@ -302,10 +316,12 @@ class PeerComparisonData:
     @classmethod
     def from_dict(cls, data: dict) -> "PeerComparisonData":
         """從字典反序列化。"""
+        if not data:
+            return cls()
         return cls(
             peers=data.get("peers", []),
-            sector=data.get("sector", ""),
-            industry=data.get("industry", ""),
+            sector=_intern(data.get("sector", "")),
+            industry=_intern(data.get("industry", "")),
             rank_in_peers=data.get("rank_in_peers", {}),
         )
 
@@ -314,7 +330,7 @@ class PeerComparisonData:
 # 頂層數據容器
 # ============================================================
 
-@dataclass
+@dataclass(slots=True, kw_only=True)
 class DeepAnalysisData:
     """Layer 3 深度分析完整數據包，整合 T1-T5 所有數據。"""
 
@@ -374,11 +390,11 @@ class DeepAnalysisData:
         return cls(
             symbol=data["symbol"],
             company_name=data.get("company_name", ""),
-            sector=data.get("sector", ""),
-            industry=data.get("industry", ""),
+            sector=_intern(data.get("sector", "")),
+            industry=_intern(data.get("industry", "")),
             market_cap=data.get("market_cap"),
             current_price=data.get("current_price"),
-            currency=data.get("currency", "USD"),
+            currency=_intern(data.get("currency", "USD")),
             graham_number=data.get("graham_number"),
             margin_of_safety_pct=data.get("margin_of_safety_pct"),
             valuation=ValuationData.from_dict(data.get("valuation", {})),
@@ -399,51 +415,54 @@ class DeepAnalysisData:
         )
 
 
+# 數據品質分數檢查的關鍵欄位（模組層級預先建立 attrgetter，單次呼叫取出所有值）
+_QUALITY_KEY_PATHS = (
+    "market_cap",
+    "current_price",
+    "valuation.ev_to_ebitda",
+    "valuation.price_to_book",
+    "valuation.target_price_mean",
+    "valuation.analyst_count",
+    "valuation.free_cashflow",
+    "valuation.beta",
+    "financial_health.total_assets",
+    "financial_health.total_debt",
+    "financial_health.total_cash",
+    "financial_health.current_ratio",
+    "growth_momentum.revenue_growth",
+    "growth_momentum.earnings_growth",
+    "risk_metrics.beta",
+    "risk_metrics.fifty_two_week_high",
+    "risk_metrics.held_percent_insiders",
+    "risk_metrics.held_percent_institutions",
+)
+
+# 歷史數據也算（非空即得分）
+_QUALITY_HISTORY_PATHS = (
+    "financial_health.revenue_history",
+    "financial_health.ebitda_history",
+    "financial_health.free_cashflow_history",
+    "growth_momentum.eps_estimates",
+    "growth_momentum.earnings_surprises",
+    "risk_metrics.insider_transactions",
+    "risk_metrics.top_institutional_holders",
+    "peer_comparison.peers",
+)
+
+_QUALITY_KEY_FIELDS = attrgetter(*_QUALITY_KEY_PATHS)
+_QUALITY_HISTORY_FIELDS = attrgetter(*_QUALITY_HISTORY_PATHS)
+_QUALITY_FIELD_TOTAL = len(_QUALITY_KEY_PATHS) + len(_QUALITY_HISTORY_PATHS)
+
+
 def calculate_data_quality_score(data: DeepAnalysisData) -> float:
     """
     計算數據完整度分數（0-1）。
 
     檢查所有關鍵欄位是否有值，回傳非 None 的比例。
     """
-    # 定義關鍵欄位清單
-    key_fields = [
-        data.market_cap,
-        data.current_price,
-        data.valuation.ev_to_ebitda,
-        data.valuation.price_to_book,
-        data.valuation.target_price_mean,
-        data.valuation.analyst_count,
-        data.valuation.free_cashflow,
-        data.valuation.beta,
-        data.financial_health.total_assets,
-        data.financial_health.total_debt,
-        data.financial_health.total_cash,
-        data.financial_health.current_ratio,
-        data.growth_momentum.revenue_growth,
-        data.growth_momentum.earnings_growth,
-        data.risk_metrics.beta,
-        data.risk_metrics.fifty_two_week_high,
-        data.risk_metrics.held_percent_insiders,
-        data.risk_metrics.held_percent_institutions,
-    ]
-
-    # 歷史數據也算（有資料即得分）
-    history_fields = [
-        len(data.financial_health.revenue_history) > 0,
-        len(data.financial_health.ebitda_history) > 0,
-        len(data.financial_health.free_cashflow_history) > 0,
-        len(data.growth_momentum.eps_estimates) > 0,
-        len(data.growth_momentum.earnings_surprises) > 0,
-        len(data.risk_metrics.insider_transactions) > 0,
-        len(data.risk_metrics.top_institutional_holders) > 0,
-        len(data.peer_comparison.peers) > 0,
-    ]
-
-    total = len(key_fields) + len(history_fields)
-    filled = sum(1 for v in key_fields if v is not None)
-    filled += sum(1 for v in history_fields if v)
-
-    return round(filled / total, 2) if total > 0 else 0.0
+    filled = sum(1 for v in _QUALITY_KEY_FIELDS(data) if v is not None)
+    filled += sum(1 for v in _QUALITY_HISTORY_FIELDS(data) if v)
+    return round(filled / _QUALITY_FIELD_TOTAL, 2)
 
 
 # ============================================================
@@ -451,16 +470,24 @@ def calculate_data_quality_score(data: DeepAnalysisData) -> float:
 # ============================================================
 
 def _safe_float(value) -> Optional[float]:
-    """安全轉換為 float，處理 NaN / None / inf。"""
+    """
+    安全轉換為 float，處理 NaN / None / inf。
+
+    yfinance info 的數值幾乎都是 float、int 或 None，先以類別比對走捷徑，
+    其他型別（numpy 純量、字串等）才經 float() 轉換與例外處理。
+    """
     if value is None:
         return None
+    cls = value.__class__
+    if cls is float:
+        return value if math.isfinite(value) else None
+    if cls is int or cls is bool:
+        return float(value)
     try:
         f = float(value)
-        if math.isnan(f) or math.isinf(f):
-            return None
-        return f
     except (TypeError, ValueError):
         return None
+    return f if math.isfinite(f) else None
 
 
 def _df_row_to_history(df: pd.DataFrame, row_name: str) -> dict[str, float]:
@@ -468,7 +495,8 @@ def _df_row_to_history(df: pd.DataFrame, row_name: str) -> dict[str, float]:
     從 DataFrame 中取出指定行，轉為 {年份: 數值} 的字典。
 
     yfinance 的 financials/balance_sheet/cashflow 的 columns 是 Timestamp，
-    index 是項目名稱。
+    index 是項目名稱。整行一次轉為 float 陣列，以 np.isfinite 過濾
+    NaN / inf；含無法轉換的值時退回逐格 _safe_float。
     """
     if df is None or df.empty:
         return {}
@@ -477,18 +505,34 @@ def _df_row_to_history(df: pd.DataFrame, row_name: str) -> dict[str, float]:
         return {}
 
     row = df.loc[row_name]
-    result = {}
-    for col in row.index:
-        val = _safe_float(row[col])
-        if val is not None:
-            # 將 Timestamp 轉為年份字串
-            if hasattr(col, "year"):
-                key = str(col.year)
-            else:
-                key = str(col)
-            result[key] = val
+    if isinstance(row, pd.DataFrame):
+        # 行名重複時取第一行
+        row = row.iloc[0]
+
+    # 將 Timestamp 轉為年份字串；同一年份跨股票、跨報表大量重複，intern 後共用
+    # 含 NaT 時 columns.year 會變成 float（'2024.0'），改走逐欄路徑與原本行為一致
+    columns = row.index
+    if isinstance(columns, pd.DatetimeIndex) and not columns.hasnans:
+        keys = columns.year.astype(str).tolist()
+    else:
+        keys = [str(col.year) if hasattr(col, "year") else str(col) for col in columns]
+    keys = list(map(_intern, keys))
 
-    return result
+    try:
+        values = row.to_numpy(dtype=np.float64, na_value=np.nan)
+    except (TypeError, ValueError):
+        return {
+            key: val
+            for key, val in zip(keys, map(_safe_float, row.tolist()))
+            if val is not None
+        }
+
+    finite = np.isfinite(values).tolist()
+    return {
+        key: val
+        for key, val, ok in zip(keys, values.tolist(), finite)
+        if ok
+    }
 
 
 def _df_to_records(df: pd.DataFrame, max_rows: int = 10) -> list[dict]:
@@ -496,23 +540,28 @@ def _df_to_records(df: pd.DataFrame, max_rows: int = 10) -> list[dict]:
     將 DataFrame 轉為 list[dict]，處理 NaN 和 Timestamp。
 
     用於 earnings_estimate、revenue_estimate、insider_transactions 等。
+    直接走訪 DataFrame.values 的列，不經 iterrows 每列建立一個 Series；
+    取值型別與 iterrows 相同（datetime 欄位先轉為 object 取得 Timestamp）。
     """
     if df is None or df.empty:
         return []
 
+    frame = df.head(max_rows)
+    values = frame.values
+    if values.dtype.kind in "mM":
+        values = frame.astype(object).values
+    columns = list(frame.columns)
+
     records = []
-    for idx, row in df.head(max_rows).iterrows():
+    for idx, row in zip(frame.index, values):
         record = {}
         # 索引也加入
         if hasattr(idx, "isoformat"):
             record["date"] = idx.isoformat()
-        elif hasattr(idx, "year"):
-            record["period"] = str(idx)
         else:
             record["period"] = str(idx)
 
-        for col in row.index:
-            val = row[col]
+        for col, val in zip(columns, row):
             if pd.isna(val):
                 record[col] = None
             elif hasattr(val, "isoformat"):
@@ -564,7 +613,7 @@ def _extract_valuation(info: dict, cashflow_df: pd.DataFrame) -> ValuationData:
         target_price_high=_safe_float(info.get("targetHighPrice")),
         target_price_low=_safe_float(info.get("targetLowPrice")),
         analyst_count=info.get("numberOfAnalystOpinions"),
-        recommendation_key=info.get("recommendationKey"),
+        recommendation_key=_intern(info.get("recommendationKey")),
         recommendation_mean=_safe_float(info.get("recommendationMean")),
         free_cashflow=_safe_float(info.get("freeCashflow")),
         free_cashflow_history=fcf_history,
@@ -786,6 +835,7 @@ def fetch_deep_data(
     symbol: str,
     retry_count: int = 2,
     retry_delay: float = 1.0,
+    price_history: Optional[dict] = None,
 ) -> DeepAnalysisData:
     """
     從 yfinance 抓取單一股票的完整深度分析數據。
@@ -797,6 +847,7 @@ def fetch_deep_data(
         symbol: 股票代碼
         retry_count: 失敗重試次數
         retry_delay: 重試間隔（秒）
+        price_history: 已批次預抓的價格歷史；None 時自行以 fetch_price_history 抓取
 
     Returns:
         DeepAnalysisData，即使部分 API 失敗也會回傳已取得的資料。
@@ -840,11 +891,11 @@ def fetch_deep_data(
             deep_data = DeepAnalysisData(
                 symbol=symbol,
                 company_name=info.get("shortName", "") or info.get("longName", ""),
-                sector=info.get("sector", ""),
-                industry=info.get("industry", ""),
+                sector=_intern(info.get("sector", "")),
+                industry=_intern(info.get("industry", "")),
                 market_cap=_safe_float(info.get("marketCap")),
                 current_price=_safe_float(info.get("currentPrice")),
-                currency=info.get("currency", "USD"),
+                currency=_intern(info.get("currency", "USD")),
                 valuation=valuation,
                 financial_health=financial_health,
                 growth_momentum=growth_momentum,
@@ -852,12 +903,15 @@ def fetch_deep_data(
                 fetched_at=datetime.now(timezone.utc).isoformat(),
             )
 
-            # 5. 價格歷史（用於走勢圖）
-            try:
-                from scripts.analyzer.price_chart import fetch_price_history
-                deep_data.price_history = fetch_price_history(symbol) or None
-            except Exception as price_err:
-                logger.warning("%s 價格歷史抓取失敗: %s", symbol, price_err)
+            # 5. 價格歷史（用於走勢圖）；已批次預抓時直接沿用
+            if price_history is not None:
+                deep_data.price_history = price_history or None
+            else:
+                try:
+                    from scripts.analyzer.price_chart import fetch_price_history
+                    deep_data.price_history = fetch_price_history(symbol) or None
+                except Exception as price_err:
+                    logger.warning("%s 價格歷史抓取失敗: %s", symbol, price_err)
 
             # 6. 計算數據品質分數
             deep_data.data_quality_score = calculate_data_quality_score(deep_data)
@@ -897,27 +951,53 @@ def fetch_batch_deep_data(
     symbols: list[str],
     delay_between: float = 0.5,
     progress_callback=None,
+    max_workers: int = 4,
 ) -> list[DeepAnalysisData]:
     """
-    批次抓取多支股票的深度數據。
+    批次抓取多支股票的深度數據，回傳順序與 symbols 相同。
+
+    每支股票約需十餘次 HTTP 往返，以執行緒池重疊等待時間。節流器只保證
+    相鄰兩支股票的抓取起點至少相隔 delay_between 秒；各支內的請求仍連續
+    發出，max_workers 支同時進行時，瞬間請求速率約為循序抓取的
+    max_workers 倍。
+
+    結果不含同業比較，也不寫入快取：快取由呼叫端在補上 peer_comparison
+    後自行寫入（見 run_layer3._analyze_single）。
 
     Args:
         symbols: 股票代碼列表
-        delay_between: 每支股票間隔（秒），深度抓取建議 0.5s
+        delay_between: 相鄰兩支股票抓取起點的間隔（秒），並行時仍全域生效
         progress_callback: 進度回呼函數 callback(current, total)
+        max_workers: 並行抓取的執行緒數（1 = 循序抓取）
     """
-    results = []
+    if not symbols:
+        return []
     total = len(symbols)
+    results: list[Optional[DeepAnalysisData]] = [None] * total
+
+    limiter = RateLimiter(delay_between)
 
-    for i, symbol in enumerate(symbols):
-        data = fetch_deep_data(symbol)
-        results.append(data)
+    # 價格歷史以 yf.download 分塊批次預抓，與逐支抓取共用節流器；
+    # 未取得者由 fetch_deep_data 逐支補抓
+    from scripts.analyzer.price_chart import fetch_price_history_batch
+    prefetched = fetch_price_history_batch(list(symbols), limiter=limiter)
 
-        if progress_callback:
-            progress_callback(i + 1, total)
+    def _worker(symbol: str) -> DeepAnalysisData:
+        limiter.wait()
+        return fetch_deep_data(symbol, price_history=prefetched.get(symbol))
 
-        if i < total - 1:
-            time.sleep(delay_between)
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = {
+            executor.submit(_worker, symbol): i for i, symbol in enumerate(symbols)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if progress_callback:
+                progress_callback(done, total)
+    finally:
+        # Ctrl-C 或例外時取消佇列中尚未開始的抓取，不必等整份清單跑完
+        executor.shutdown(wait=False, cancel_futures=True)
 
     return results
 
@@ -945,6 +1025,8 @@ from scripts.scanner.config import CacheConfig, DEFAULT_CACHE_CONFIG
 
 _CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "data"
 
+_CACHE_ENCODER = json.JSONEncoder(ensure_ascii=False, check_circular=False)
+
 # 深度分析快取使用獨立的檔案和設定
 DEEP_CACHE_CONFIG = CacheConfig(
     ttl_seconds=86400,  # 24 小時
@@ -958,7 +1040,8 @@ class DeepDataCache:
     Layer 3 深度分析數據的 TTL 快取管理器。
 
     與 MetricsCache 設計模式相同，但儲存 DeepAnalysisData。
-    快取檔案: data/deep_analysis_cache.json
+    快取檔案: data/deep_analysis_cache.json（快照）
+    　　　　+ data/deep_analysis_cache.log（增量日誌，定期合併回快照）
 
     使用方法：
         cache = DeepDataCache()
@@ -976,38 +1059,111 @@ class DeepDataCache:
         self._config = config
         self._cache_dir = cache_dir or _CACHE_DIR
         self._cache_path = self._cache_dir / config.cache_filename
+        # 增量更新日誌：每行一筆 [symbol, entry]，load 時覆蓋於快照之上
+        self._log_path = self._cache_path.with_suffix(".log")
         self._data: dict[str, dict] = {}
-        self._dirty = False
+        self._dirty: set[str] = set()
+        self._needs_rewrite = False
+        self._snapshot_count = 0
+        self._log_count = 0
 
     def load(self) -> None:
-        """從磁碟載入快取檔案。損壞時建立空快取。"""
-        if not self._cache_path.exists():
-            self._data = {}
-            return
+        """
+        從磁碟載入快照與增量日誌。
 
-        try:
-            with open(self._cache_path) as f:
-                self._data = json.load(f)
-            logger.debug("深度快取已載入: %d 筆資料", len(self._data))
-        except (json.JSONDecodeError, OSError) as e:
-            logger.warning("深度快取檔案損壞，重建空快取: %s", e)
-            self._data = {}
+        快照損壞時以空快取為底，仍重播日誌，並在下次 save 時重寫快照。
+        """
+        self._data = {}
+        self._dirty = set()
+        self._needs_rewrite = False
+        self._snapshot_count = 0
+        self._log_count = 0
+
+        if self._cache_path.exists():
+            try:
+                with open(self._cache_path, encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning("深度快取檔案損壞，重建空快取: %s", e)
+                self._data = {}
+                self._needs_rewrite = True
+        self._snapshot_count = len(self._data)
+
+        if self._log_path.exists():
+            with open(self._log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        key, entry = json.loads(line)
+                    except (ValueError, TypeError):
+                        # 寫入中斷留下的半行，之後的內容不可信
+                        logger.warning("深度快取日誌尾端損壞，已忽略")
+                        self._needs_rewrite = True
+                        break
+                    self._data[key] = entry
+                    self._log_count += 1
+
+        logger.debug("深度快取已載入: %d 筆資料", len(self._data))
 
     def save(self) -> None:
-        """將記憶體快取寫回磁碟（dirty flag + atomic write）。"""
-        if not self._dirty:
+        """
+        將變更寫回磁碟（per-symbol dirty set）。
+
+        一般只把變更的 symbol 追加至日誌，單筆 put 不必重寫整個快取；
+        日誌累積超過快照一半（或經 clear / 損壞）時才合併重寫快照。
+        """
+        if not self._dirty and not self._needs_rewrite:
             return
 
         self._cache_dir.mkdir(parents=True, exist_ok=True)
 
+        pending = self._log_count + len(self._dirty)
+        if (
+            self._needs_rewrite
+            or not self._cache_path.exists()
+            or pending > self._snapshot_count // 2
+        ):
+            self._write_snapshot()
+        else:
+            self._append_log()
+
+        self._dirty = set()
+        self._needs_rewrite = False
+
+    def _write_snapshot(self) -> None:
+        """
+        重寫完整快照（atomic write）並清除日誌。
+
+        日誌須在新快照就位前刪除：若反過來在兩步之間中斷，舊日誌會留在新快照
+        旁，下次 load 時以過時的內容覆蓋新資料。先刪日誌最多只會遺失該批變更，
+        下次查詢時重新抓取即可。
+        """
+        # 每個 symbol 一行：indent 會讓 json 改走純 Python 編碼器，
+        # 逐筆以 C 編碼器輸出，檔案仍是合法 JSON
+        encode = _CACHE_ENCODER.encode
         tmp_path = self._cache_path.with_suffix(".tmp")
-        with open(tmp_path, "w") as f:
-            json.dump(self._data, f, indent=2, ensure_ascii=False)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("{")
+            for i, (key, entry) in enumerate(self._data.items()):
+                f.write(",\n" if i else "\n")
+                f.write(f"{encode(key)}: {encode(entry)}")
+            f.write("\n}\n" if self._data else "}\n")
+        self._log_path.unlink(missing_ok=True)
         os.replace(tmp_path, self._cache_path)
-
-        self._dirty = False
+        self._snapshot_count = len(self._data)
+        self._log_count = 0
         logger.info("深度快取已存檔: %d 筆 -> %s", len(self._data), self._cache_path)
 
+    def _append_log(self) -> None:
+        """將變更的 symbol 追加至日誌。"""
+        encode = _CACHE_ENCODER.encode
+        with open(self._log_path, "a", encoding="utf-8") as f:
+            for key in self._dirty:
+                f.write(encode([key, self._data[key]]) + "\n")
+        self._log_count += len(self._dirty)
+        logger.info(
+            "深度快取已追加 %d 筆 -> %s", len(self._dirty), self._log_path,
+        )
+
     def get(self, symbol: str) -> Optional[DeepAnalysisData]:
         """
         查詢快取。回傳未過期的 DeepAnalysisData，或 None。
@@ -1046,12 +1202,13 @@ class DeepDataCache:
             "fetched_at": datetime.now(timezone.utc).isoformat(),
             "deep_data": deep_data.to_dict(),
         }
-        self._dirty = True
+        self._dirty.add(key)
 
     def clear(self) -> None:
         """清除所有快取。"""
         self._data = {}
-        self._dirty = True
+        self._dirty = set()
+        self._needs_rewrite = True
 
     @property
     def size(self) -> int:
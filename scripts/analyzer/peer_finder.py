@@ -5,12 +5,15 @@
 計算目標股在同業中各項指標的排名。
 """
 
+import heapq
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import yfinance as yf
 
 from scripts.scanner.data_fetcher import fetch_batch_metrics, TickerMetrics
+from scripts.scanner.rate_limiter import RateLimiter
 from scripts.analyzer.deep_data_fetcher import (
     PeerComparisonData,
     _safe_float,
@@ -19,6 +22,11 @@ from scripts.analyzer.deep_data_fetcher import (
 logger = logging.getLogger(__name__)
 
 
+def _market_cap_key(m: TickerMetrics) -> float:
+    """同業挑選的排序鍵：市值，缺值視為 0。"""
+    return m.market_cap or 0
+
+
 def find_peers(
     symbol: str,
     sector: str,
@@ -74,9 +82,9 @@ def find_peers(
     ]
 
     if len(same_industry) >= count:
-        # 按市值排序，取前 count 支
-        same_industry.sort(key=lambda m: m.market_cap or 0, reverse=True)
-        return [m.symbol for m in same_industry[:count]]
+        # 按市值取前 count 支（nlargest 同值時與穩定排序結果一致）
+        top = heapq.nlargest(count, same_industry, key=_market_cap_key)
+        return [m.symbol for m in top]
 
     # 第二輪：擴展到同 sector
     same_sector = [
@@ -87,13 +95,15 @@ def find_peers(
     ]
 
     # ★ 先按市值排序，確保合併時優先選市值大的同業
-    same_industry.sort(key=lambda m: m.market_cap or 0, reverse=True)
-    same_sector.sort(key=lambda m: m.market_cap or 0, reverse=True)
+    same_industry.sort(key=_market_cap_key, reverse=True)
+    # 同 sector 只需市值前 count 支：其中至多 len(same_industry) 支與
+    # 同 industry 重複，剩下的足以補滿 count
+    top_sector = heapq.nlargest(count, same_sector, key=_market_cap_key)
 
     # 合併：先同 industry（已按市值排序），再補充同 sector（已按市值排序）
     seen = set(m.symbol for m in same_industry)
     combined = list(same_industry)
-    for m in same_sector:
+    for m in top_sector:
         if m.symbol not in seen:
             combined.append(m)
             seen.add(m.symbol)
@@ -103,56 +113,104 @@ def find_peers(
     return [m.symbol for m in combined[:count]]
 
 
+# yfinance info 鍵 → 同業指標鍵（輸出順序即此順序）；
+# 第三欄為除數，debtToEquity 以百分比回傳，需除以 100
+_PEER_INFO_FIELDS: tuple[tuple[str, str, Optional[float]], ...] = (
+    ("trailingPE", "pe", None),
+    ("forwardPE", "forward_pe", None),
+    ("enterpriseToEbitda", "ev_ebitda", None),
+    ("enterpriseToRevenue", "ev_revenue", None),
+    ("priceToBook", "price_to_book", None),
+    ("returnOnEquity", "roe", None),
+    ("grossMargins", "gross_margin", None),
+    ("operatingMargins", "operating_margin", None),
+    ("profitMargins", "profit_margin", None),
+    ("revenueGrowth", "revenue_growth", None),
+    ("earningsGrowth", "earnings_growth", None),
+    ("marketCap", "market_cap", None),
+    ("beta", "beta", None),
+    ("dividendYield", "dividend_yield", None),
+    ("debtToEquity", "debt_to_equity", 100.0),
+)
+
+
+# 抓取失敗時的空指標：鍵與成功時相同，值全為 None
+_EMPTY_PEER_METRICS: dict[str, None] = dict.fromkeys(
+    dst for _, dst, _ in _PEER_INFO_FIELDS
+)
+
+
+def _peer_metrics_from_info(symbol: str, info: dict) -> dict:
+    """將 yfinance info 字典轉為同業比較用的指標字典。"""
+    get = info.get
+    metrics = {"symbol": symbol, "name": get("shortName", "")}
+    for src, dst, divisor in _PEER_INFO_FIELDS:
+        raw = get(src)
+        if divisor is not None and raw is not None:
+            raw = raw / divisor
+        metrics[dst] = _safe_float(raw)
+    return metrics
+
+
+def _fetch_single_peer(symbol: str) -> dict:
+    """抓取單支同業的比較指標，失敗時回傳只有代碼的空指標。"""
+    try:
+        ticker = yf.Ticker(symbol)
+        return _peer_metrics_from_info(symbol, ticker.info or {})
+    except Exception as e:
+        logger.warning("無法抓取同業 %s: %s", symbol, e)
+        return {"symbol": symbol, "name": "", **_EMPTY_PEER_METRICS}
+
+
 def fetch_peer_metrics(
     peer_symbols: list[str],
+    max_workers: int = 4,
+    delay_between: float = 0.1,
 ) -> list[dict]:
     """
     批量抓取同業的關鍵比較指標。
 
     每支同業抓取 PE, EV/EBITDA, ROE, 毛利率, 市值等。
-    使用 Layer 1 快取加速。
+    每支同業各需一次 .info 往返，以執行緒池重疊等待時間；
+    與 Layer 1 批次抓取相同，以共用節流器間隔各支的請求起點。
 
     Args:
         peer_symbols: 同業股票代碼列表
+        max_workers: 並行抓取的執行緒數（1 = 循序抓取）
+        delay_between: 相鄰兩支同業抓取起點的最小間隔（秒），並行時仍全域生效
 
     Returns:
-        每支同業的指標字典列表
+        每支同業的指標字典列表，順序與 peer_symbols 相同
     """
-    peers_data = []
-
-    for symbol in peer_symbols:
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info or {}
-
-            peers_data.append({
-                "symbol": symbol,
-                "name": info.get("shortName", ""),
-                "pe": _safe_float(info.get("trailingPE")),
-                "forward_pe": _safe_float(info.get("forwardPE")),
-                "ev_ebitda": _safe_float(info.get("enterpriseToEbitda")),
-                "ev_revenue": _safe_float(info.get("enterpriseToRevenue")),
-                "price_to_book": _safe_float(info.get("priceToBook")),
-                "roe": _safe_float(info.get("returnOnEquity")),
-                "gross_margin": _safe_float(info.get("grossMargins")),
-                "operating_margin": _safe_float(info.get("operatingMargins")),
-                "profit_margin": _safe_float(info.get("profitMargins")),
-                "revenue_growth": _safe_float(info.get("revenueGrowth")),
-                "earnings_growth": _safe_float(info.get("earningsGrowth")),
-                "market_cap": _safe_float(info.get("marketCap")),
-                "beta": _safe_float(info.get("beta")),
-                "dividend_yield": _safe_float(info.get("dividendYield")),
-                "debt_to_equity": _safe_float(
-                    info.get("debtToEquity") / 100.0
-                    if info.get("debtToEquity") is not None
-                    else None
-                ),
-            })
-        except Exception as e:
-            logger.warning("無法抓取同業 %s: %s", symbol, e)
-            peers_data.append({"symbol": symbol, "name": "", "pe": None})
-
-    return peers_data
+    if not peer_symbols:
+        return []
+
+    limiter = RateLimiter(delay_between)
+
+    def _worker(symbol: str) -> dict:
+        limiter.wait()
+        return _fetch_single_peer(symbol)
+
+    workers = max(1, min(max_workers, len(peer_symbols)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_worker, peer_symbols))
+
+
+# 排名指標與方向（True = 越高越好），輸出順序即此順序
+_RANK_METRICS: tuple[tuple[str, bool], ...] = (
+    # 越低越好的指標
+    ("pe", False),
+    ("forward_pe", False),
+    ("ev_ebitda", False),
+    ("debt_to_equity", False),
+    # 越高越好的指標
+    ("roe", True),
+    ("gross_margin", True),
+    ("operating_margin", True),
+    ("profit_margin", True),
+    ("revenue_growth", True),
+    ("earnings_growth", True),
+)
 
 
 def rank_among_peers(
@@ -173,37 +231,26 @@ def rank_among_peers(
     Returns:
         {指標名: 排名} 字典，1 = 最佳
     """
-    # 越低越好的指標
-    lower_is_better = ["pe", "forward_pe", "ev_ebitda", "debt_to_equity"]
-    # 越高越好的指標
-    higher_is_better = [
-        "roe", "gross_margin", "operating_margin", "profit_margin",
-        "revenue_growth", "earnings_growth",
-    ]
-
-    all_entries = [target_metrics] + peers
     rankings = {}
 
-    for metric_name in lower_is_better + higher_is_better:
-        # 收集有效值
-        values = []
-        for entry in all_entries:
-            val = entry.get(metric_name)
-            if val is not None:
-                values.append((entry["symbol"], val))
-
-        if not values:
+    for metric_name, higher_is_better in _RANK_METRICS:
+        target_val = target_metrics.get(metric_name)
+        if target_val is None:
             continue
 
-        # 排序
-        reverse = metric_name in higher_is_better
-        values.sort(key=lambda x: x[1], reverse=reverse)
-
-        # 找目標股的排名
-        for rank, (sym, _) in enumerate(values, 1):
-            if sym == target_metrics["symbol"]:
-                rankings[metric_name] = rank
-                break
+        # 排名 = 1 + 嚴格優於目標股的同業數（單次走訪計數，不排序）；
+        # 同值時目標股排在前面，與穩定排序的結果一致
+        if higher_is_better:
+            better = sum(
+                1 for p in peers
+                if (v := p.get(metric_name)) is not None and v > target_val
+            )
+        else:
+            better = sum(
+                1 for p in peers
+                if (v := p.get(metric_name)) is not None and v < target_val
+            )
+        rankings[metric_name] = better + 1
 
     return rankings
 
@@ -243,26 +290,7 @@ def build_peer_comparison(
     peers = fetch_peer_metrics(peer_symbols)
 
     # 3. 建立目標股的指標（與 peers 格式一致）
-    raw_de = target_info.get("debtToEquity")
-    target_metrics = {
-        "symbol": symbol,
-        "name": target_info.get("shortName", ""),
-        "pe": _safe_float(target_info.get("trailingPE")),
-        "forward_pe": _safe_float(target_info.get("forwardPE")),
-        "ev_ebitda": _safe_float(target_info.get("enterpriseToEbitda")),
-        "ev_revenue": _safe_float(target_info.get("enterpriseToRevenue")),
-        "price_to_book": _safe_float(target_info.get("priceToBook")),
-        "roe": _safe_float(target_info.get("returnOnEquity")),
-        "gross_margin": _safe_float(target_info.get("grossMargins")),
-        "operating_margin": _safe_float(target_info.get("operatingMargins")),
-        "profit_margin": _safe_float(target_info.get("profitMargins")),
-        "revenue_growth": _safe_float(target_info.get("revenueGrowth")),
-        "earnings_growth": _safe_float(target_info.get("earningsGrowth")),
-        "market_cap": _safe_float(target_info.get("marketCap")),
-        "beta": _safe_float(target_info.get("beta")),
-        "dividend_yield": _safe_float(target_info.get("dividendYield")),
-        "debt_to_equity": _safe_float(raw_de / 100.0 if raw_de is not None else None),
-    }
+    target_metrics = _peer_metrics_from_info(symbol, target_info)
 
     # 4. 排名
     rankings = rank_among_peers(target_metrics, peers)
@@ -7,10 +7,14 @@
 
 import logging
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
+import pandas as pd
 import yfinance as yf
 
+from scripts.scanner.rate_limiter import RateLimiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,11 +51,125 @@ def fetch_price_history(
         return {}
 
 
+def fetch_price_history_batch(
+    symbols: list[str],
+    period: str = "6mo",
+    limiter: RateLimiter | None = None,
+    chunk_size: int = 10,
+) -> dict[str, dict]:
+    """
+    以 yf.download 批次抓取多支股票的價格歷史。
+
+    yf.download 內部以多執行緒對每支股票各發一次請求，本身不經過
+    RateLimiter；因此將代碼切成每 chunk_size 支一塊，每塊下載前佔用
+    limiter 一個時間槽。一塊約 10 次請求，與一支股票深度抓取的請求量相當，
+    與深度抓取共用節流器時整體速率不會因預抓而失控。
+
+    Args:
+        symbols: 股票代碼列表
+        period: 時間範圍（預設 6 個月）
+        limiter: 與深度抓取共用的 RateLimiter（None = 不節流）
+        chunk_size: 每次 yf.download 的代碼數，即單次最大並行請求數
+
+    Returns:
+        {symbol: {"dates": [...], "closes": [...]}}，只包含取得數據的股票；
+        缺少的股票由呼叫端改用 fetch_price_history 逐支抓取
+    """
+    step = max(1, chunk_size)
+    results = {}
+    for start in range(0, len(symbols), step):
+        if limiter is not None:
+            limiter.wait()
+        results.update(_download_closes(list(symbols[start:start + step]), period))
+    return results
+
+
+def _download_closes(symbols: list[str], period: str) -> dict[str, dict]:
+    """單次 yf.download 並依代碼拆出收盤價，失敗時回傳空 dict。"""
+    try:
+        df = yf.download(
+            tickers=symbols,
+            period=period,
+            group_by="ticker",
+            threads=True,
+            progress=False,
+        )
+    except Exception as e:
+        logger.warning(f"批次價格歷史抓取失敗: {e}")
+        return {}
+
+    if df is None or df.empty:
+        return {}
+
+    multi = isinstance(df.columns, pd.MultiIndex)
+    downloaded = set(df.columns.get_level_values(0)) if multi else set()
+
+    results = {}
+    for symbol in symbols:
+        if multi:
+            if symbol not in downloaded:
+                continue
+            closes = df[symbol].get("Close")
+        elif len(symbols) == 1:
+            closes = df.get("Close")
+        else:
+            continue
+
+        if closes is None:
+            continue
+        # 各股交易日不同時，缺少的日期會補 NaN
+        closes = closes.dropna()
+        if closes.empty:
+            continue
+
+        results[symbol] = {
+            "dates": [d.strftime("%Y-%m-%d") for d in closes.index],
+            "closes": [round(float(c), 2) for c in closes],
+        }
+
+    logger.info(f"批次取得 {len(results)}/{len(symbols)} 支股票的價格數據")
+    return results
+
+
+@lru_cache(maxsize=None)
+def _configure_matplotlib() -> None:
+    """
+    matplotlib 全域設定（後端、中文字體、深色主題），整個行程只執行一次。
+
+    這些設定寫入全域 rcParams，每張圖重設只是重複工作；
+    字體清單若每次都往前插入還會不斷變長。
+    警告過濾器不放在這裡：warnings.catch_warnings 會還原過濾器，須每次設定。
+    """
+    import matplotlib
+    matplotlib.use("Agg")  # 非互動式後端
+    import matplotlib.pyplot as plt
+
+    # 嘗試設定支援中文的字體
+    try:
+        from matplotlib.font_manager import FontProperties
+        for font_name in ["Microsoft JhengHei", "Microsoft YaHei", "SimHei", "Arial Unicode MS"]:
+            try:
+                fp = FontProperties(family=font_name)
+                if fp.get_name() != font_name:
+                    continue
+                matplotlib.rcParams["font.sans-serif"] = [font_name] + matplotlib.rcParams.get("font.sans-serif", [])
+                matplotlib.rcParams["axes.unicode_minus"] = False
+                break
+            except Exception:
+                continue
+    except Exception:
+        pass
+
+    # 深色主題
+    plt.style.use("dark_background")
+
+
 def generate_price_chart(
     symbol: str,
     company_name: str,
     price_history: dict,
     output_dir: Path,
+    fetched_at: str | None = None,
 ) -> str | None:
     """
     生成 6 個月價格走勢圖 PNG。
@@ -61,6 +179,8 @@ def generate_price_chart(
         company_name: 公司名稱
         price_history: {"dates": [...], "closes": [...]}
         output_dir: 報告根目錄（圖表存至 output_dir/charts/）
+        fetched_at: price_history 的抓取時間（ISO 格式）；當日圖表比它新才沿用，
+            未提供時一律重繪
 
     Returns:
         圖表相對路徑（相對於 output_dir），失敗時回傳 None
@@ -69,37 +189,38 @@ def generate_price_chart(
         logger.warning(f"{symbol} 無價格數據，跳過圖表生成")
         return None
 
+    charts_dir = output_dir / "charts"
+    date_str = datetime.now().strftime("%Y%m%d")
+    filename = f"price_chart_{symbol}_{date_str}.png"
+    filepath = charts_dir / filename
+    relative_path = f"charts/{filename}"
+
+    # 當日圖表在數據抓取之後才繪製就直接沿用；
+    # --force-refresh 或重新抓取後 fetched_at 較新，舊圖表不可沿用
+    if fetched_at:
+        try:
+            stat = filepath.stat()
+            if (
+                stat.st_size > 0
+                and stat.st_mtime > datetime.fromisoformat(fetched_at).timestamp()
+            ):
+                logger.info(f"{symbol} 價格走勢圖已存在，沿用 {filepath}")
+                return relative_path
+        except (OSError, ValueError):
+            pass
+
     try:
-        import matplotlib
-        matplotlib.use("Agg")  # 非互動式後端
+        _configure_matplotlib()
+        import warnings
+        warnings.filterwarnings("ignore", message="Glyph .* missing from")
         import matplotlib.pyplot as plt
         import matplotlib.dates as mdates
         from datetime import datetime as dt
 
-        # 嘗試設定支援中文的字體
-        import warnings
-        warnings.filterwarnings("ignore", message="Glyph .* missing from")
-        try:
-            from matplotlib.font_manager import FontProperties
-            for font_name in ["Microsoft JhengHei", "Microsoft YaHei", "SimHei", "Arial Unicode MS"]:
-                try:
-                    fp = FontProperties(family=font_name)
-                    if fp.get_name() != font_name:
-                        continue
-                    matplotlib.rcParams["font.sans-serif"] = [font_name] + matplotlib.rcParams.get("font.sans-serif", [])
-                    matplotlib.rcParams["axes.unicode_minus"] = False
-                    break
-                except Exception:
-                    continue
-        except Exception:
-            pass
-
         dates_str = price_history["dates"]
         closes = price_history["closes"]
         dates = [dt.strptime(d, "%Y-%m-%d") for d in dates_str]
 
-        # 深色主題
-        plt.style.use("dark_background")
         fig, ax = plt.subplots(figsize=(10, 4), dpi=100)
 
         # 折線圖
@@ -162,17 +283,11 @@ def generate_price_chart(
         fig.tight_layout()
 
         # 存檔
-        charts_dir = output_dir / "charts"
         charts_dir.mkdir(parents=True, exist_ok=True)
 
-        date_str = datetime.now().strftime("%Y%m%d")
-        filename = f"price_chart_{symbol}_{date_str}.png"
-        filepath = charts_dir / filename
-
         fig.savefig(filepath, facecolor=fig.get_facecolor(), bbox_inches="tight")
         plt.close(fig)
 
-        relative_path = f"charts/{filename}"
         logger.info(f"{symbol} 價格走勢圖已存至 {filepath}")
         return relative_path
 
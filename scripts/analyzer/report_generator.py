@@ -25,18 +25,22 @@ logger = logging.getLogger(__name__)
 # 數字格式化輔助函數
 # ============================================================
 
+# 千分位格式規格依小數位數預先建立，省去每次組合巢狀 f-string 規格
+_NUM_SPECS: dict[int, str] = {d: f",.{d}f" for d in range(7)}
+
+
 def _fmt_number(value: Optional[float], decimals: int = 1) -> str:
     """格式化數字，None 顯示 N/A。"""
     if value is None:
         return "N/A"
-    return f"{value:,.{decimals}f}"
+    return format(value, _NUM_SPECS.get(decimals) or f",.{decimals}f")
 
 
 def _fmt_pct(value: Optional[float], decimals: int = 1) -> str:
     """格式化百分比（0.15 → 15.0%），None 顯示 N/A。"""
     if value is None:
         return "N/A"
-    return f"{value * 100:,.{decimals}f}%"
+    return format(value * 100, _NUM_SPECS.get(decimals) or f",.{decimals}f") + "%"
 
 
 def _fmt_large(value: Optional[float]) -> str:
@@ -68,7 +72,8 @@ def _fmt_ratio(value: Optional[float], decimals: int = 1) -> str:
     """格式化倍數（如 P/E），None 顯示 N/A。"""
     if value is None:
         return "N/A"
-    return f"{value:.{decimals}f}x"
+    # 無千分位，可走 printf 式格式化（比巢狀 f-string 規格少一次組字串與解析）
+    return "%.*fx" % (decimals, value)
 
 
 # ============================================================
@@ -243,10 +248,10 @@ def _render_t3_growth_momentum(data: DeepAnalysisData) -> str:
     # EPS 預估
     eps_section = ""
     if gm.eps_estimates:
-        eps_rows = ""
-        for est in gm.eps_estimates:
-            period = est.get("period", "")
-            eps_rows += f"| {period} | {_fmt_number(est.get('avg'), 2)} | {_fmt_number(est.get('low'), 2)} | {_fmt_number(est.get('high'), 2)} | {est.get('numberOfAnalysts', 'N/A')} | {_fmt_pct(est.get('growth'))} |\n"
+        eps_rows = "".join(
+            f"| {est.get('period', '')} | {_fmt_number(est.get('avg'), 2)} | {_fmt_number(est.get('low'), 2)} | {_fmt_number(est.get('high'), 2)} | {est.get('numberOfAnalysts', 'N/A')} | {_fmt_pct(est.get('growth'))} |\n"
+            for est in gm.eps_estimates
+        )
 
         eps_section = f"""
 ### 分析師 EPS 預估
@@ -257,9 +262,10 @@ def _render_t3_growth_momentum(data: DeepAnalysisData) -> str:
     # 盈餘驚喜
     surprise_section = ""
     if gm.earnings_surprises:
-        surprise_rows = ""
-        for s in gm.earnings_surprises[:6]:
-            surprise_rows += f"| {s.get('date', '')[:10]} | {_fmt_number(s.get('estimate'), 2)} | {_fmt_number(s.get('actual'), 2)} | {_fmt_pct(s.get('surprise_pct', 0) / 100 if s.get('surprise_pct') else None)} |\n"
+        surprise_rows = "".join(
+            f"| {s.get('date', '')[:10]} | {_fmt_number(s.get('estimate'), 2)} | {_fmt_number(s.get('actual'), 2)} | {_fmt_pct(s.get('surprise_pct', 0) / 100 if s.get('surprise_pct') else None)} |\n"
+            for s in gm.earnings_surprises[:6]
+        )
 
         surprise_section = f"""
 ### 歷史盈餘驚喜
@@ -301,16 +307,18 @@ def _render_t4_risk_scenario(data: DeepAnalysisData) -> str:
 | 賣出 | {sells} |
 """
         # 列出前 5 筆
-        insider_section += "\n| 內部人 | 職位 | 交易 | 股數 | 金額 |\n|--------|------|------|------|------|\n"
-        for t in rm.insider_transactions[:5]:
-            insider_section += f"| {t.get('insider', '')} | {t.get('position', '')} | {t.get('transaction', '')} | {_fmt_number(t.get('shares'), 0)} | {_fmt_large(t.get('value'))} |\n"
+        insider_section += "\n| 內部人 | 職位 | 交易 | 股數 | 金額 |\n|--------|------|------|------|------|\n" + "".join(
+            f"| {t.get('insider', '')} | {t.get('position', '')} | {t.get('transaction', '')} | {_fmt_number(t.get('shares'), 0)} | {_fmt_large(t.get('value'))} |\n"
+            for t in rm.insider_transactions[:5]
+        )
 
     # 機構持股
     inst_section = ""
     if rm.top_institutional_holders:
-        inst_section = "\n### 前 5 大機構持股\n| 機構 | 持股比例 | 持股數 |\n|------|---------|-------|\n"
-        for h in rm.top_institutional_holders[:5]:
-            inst_section += f"| {h.get('holder', '')} | {_fmt_pct(h.get('pct_held'))} | {_fmt_number(h.get('shares'), 0)} |\n"
+        inst_section = "\n### 前 5 大機構持股\n| 機構 | 持股比例 | 持股數 |\n|------|---------|-------|\n" + "".join(
+            f"| {h.get('holder', '')} | {_fmt_pct(h.get('pct_held'))} | {_fmt_number(h.get('shares'), 0)} |\n"
+            for h in rm.top_institutional_holders[:5]
+        )
 
     return f"""## T4: 風險與情境分析 — {data.company_name} ({data.symbol})
 
@@ -351,7 +359,7 @@ def _render_t5_peer_comparison(data: DeepAnalysisData) -> str:
     rank_section = ""
     if pc.rank_in_peers:
         total = len(pc.peers) + 1  # 含自身
-        rank_rows = ""
+        rank_lines = []
         metric_names = {
             "pe": "P/E", "forward_pe": "Forward P/E", "ev_ebitda": "EV/EBITDA",
             "roe": "ROE", "gross_margin": "毛利率", "operating_margin": "營業利益率",
@@ -361,7 +369,8 @@ def _render_t5_peer_comparison(data: DeepAnalysisData) -> str:
         for metric, rank in sorted(pc.rank_in_peers.items(), key=lambda x: x[1]):
             name = metric_names.get(metric, metric)
             emoji = "🏆" if rank == 1 else ("🥈" if rank == 2 else "")
-            rank_rows += f"| {name} | {rank}/{total} {emoji} |\n"
+            rank_lines.append(f"| {name} | {rank}/{total} {emoji} |\n")
+        rank_rows = "".join(rank_lines)
 
         rank_section = f"""
 ### 排名摘要（1 = 最佳）
@@ -370,12 +379,13 @@ def _render_t5_peer_comparison(data: DeepAnalysisData) -> str:
 {rank_rows}"""
 
     # 同業比較表
-    peer_table = "### 同業比較表\n| 代碼 | 名稱 | P/E | EV/EBITDA | ROE | 毛利率 | 市值 |\n|------|------|-----|----------|-----|--------|------|\n"
+    peer_rows = ["### 同業比較表\n| 代碼 | 名稱 | P/E | EV/EBITDA | ROE | 毛利率 | 市值 |\n|------|------|-----|----------|-----|--------|------|\n"]
     # 先列出目標股
-    peer_table += f"| **{data.symbol}** | **{data.company_name}** | **{_fmt_ratio(data.valuation.trailing_pe)}** | **{_fmt_ratio(data.valuation.ev_to_ebitda)}** | **{_fmt_pct(data.risk_metrics.held_percent_insiders)}** | N/A | **{_fmt_large(data.market_cap)}** |\n"
+    peer_rows.append(f"| **{data.symbol}** | **{data.company_name}** | **{_fmt_ratio(data.valuation.trailing_pe)}** | **{_fmt_ratio(data.valuation.ev_to_ebitda)}** | **{_fmt_pct(data.risk_metrics.held_percent_insiders)}** | N/A | **{_fmt_large(data.market_cap)}** |\n")
 
     for p in pc.peers:
-        peer_table += f"| {p.get('symbol', '')} | {p.get('name', '')[:20]} | {_fmt_ratio(p.get('pe'))} | {_fmt_ratio(p.get('ev_ebitda'))} | {_fmt_pct(p.get('roe'))} | {_fmt_pct(p.get('gross_margin'))} | {_fmt_large(p.get('market_cap'))} |\n"
+        peer_rows.append(f"| {p.get('symbol', '')} | {p.get('name', '')[:20]} | {_fmt_ratio(p.get('pe'))} | {_fmt_ratio(p.get('ev_ebitda'))} | {_fmt_pct(p.get('roe'))} | {_fmt_pct(p.get('gross_margin'))} | {_fmt_large(p.get('market_cap'))} |\n")
+    peer_table = "".join(peer_rows)
 
     return f"""## T5: 同業競爭力排名 — {data.company_name} ({data.symbol})
 
@@ -507,6 +517,7 @@ def generate_report(
             company_name=data.company_name,
             price_history=data.price_history,
             output_dir=output_dir,
+            fetched_at=data.fetched_at,
         )
         if chart_path:
             chart_markdown = f"![{data.symbol} 價格走勢]({chart_path})"
@@ -25,6 +25,7 @@ load_dotenv()  # 載入 .env 環境變數
 
 from scripts.analyzer.deep_data_fetcher import (
     fetch_deep_data,
+    fetch_batch_deep_data,
     DeepDataCache,
     DeepAnalysisData,
 )
@@ -82,31 +83,36 @@ def _analyze_single(
     use_cache: bool = True,
     ai_summary: bool = True,
     include_chart: bool = True,
+    deep_data: DeepAnalysisData | None = None,
 ) -> dict | None:
     """
     對單一股票執行完整深度分析流程。
 
     流程：抓取深度數據 → 同業比較 → 生成報告 → 持久化。
 
+    Args:
+        deep_data: main() 批次預抓的深度數據；提供時跳過快取檢查與抓取
+
     Returns:
         generate_report() 的結果字典，或 None（失敗時）
     """
-    # 1. 檢查快取
-    if use_cache:
-        cached = _cache.get(symbol)
-        if cached is not None:
-            logger.info("[快取命中] %s，直接生成報告", symbol)
-            result = generate_report(
-                cached,
-                ai_summary=ai_summary,
-                include_chart=include_chart,
-                output_dir=REPORTS_DIR,
-            )
-            return result
-
-    # 2. 抓取深度數據
-    logger.info("[抓取中] %s 深度數據...", symbol)
-    deep_data = fetch_deep_data(symbol)
+    if deep_data is None:
+        # 1. 檢查快取
+        if use_cache:
+            cached = _cache.get(symbol)
+            if cached is not None:
+                logger.info("[快取命中] %s，直接生成報告", symbol)
+                result = generate_report(
+                    cached,
+                    ai_summary=ai_summary,
+                    include_chart=include_chart,
+                    output_dir=REPORTS_DIR,
+                )
+                return result
+
+        # 2. 抓取深度數據
+        logger.info("[抓取中] %s 深度數據...", symbol)
+        deep_data = fetch_deep_data(symbol)
 
     if not deep_data.company_name:
         logger.warning("[跳過] %s: 無法取得基礎數據", symbol)
@@ -249,6 +255,20 @@ def main():
     if use_cache:
         _cache.load()
 
+    # 快取未命中者先並行批次抓取深度數據（共用節流器），
+    # 同業比較與報告生成仍逐支進行；批次失敗時退回 _analyze_single 逐支抓取
+    to_fetch = [
+        symbol for symbol in dict.fromkeys(tickers)
+        if not use_cache or _cache.get(symbol) is None
+    ]
+    prefetched: dict[str, DeepAnalysisData] = {}
+    if to_fetch:
+        logger.info("[批次抓取] %d 支股票深度數據...", len(to_fetch))
+        try:
+            prefetched = dict(zip(to_fetch, fetch_batch_deep_data(to_fetch)))
+        except Exception as e:
+            logger.warning("[批次抓取失敗] 改為逐支抓取: %s", e)
+
     # 逐支分析
     results = []
     for i, symbol in enumerate(tickers, 1):
@@ -261,6 +281,7 @@ def main():
                 use_cache=use_cache,
                 ai_summary=ai_summary,
                 include_chart=include_chart,
+                deep_data=prefetched.get(symbol),
             )
             if result:
                 results.append(result)
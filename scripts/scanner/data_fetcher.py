@@ -5,17 +5,32 @@ Handles API errors, rate limits, missing data, and the known
 pegRatio issue (broken since June 2025).
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
+from operator import attrgetter
 from typing import Optional
 import logging
+import sys
 import time
 
+import numpy as np
 import yfinance as yf
 
+from scripts.scanner.rate_limiter import RateLimiter
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+def _intern(value: Optional[str]) -> Optional[str]:
+    """
+    產業/行業名稱大量重複（sp1500 約 11 個產業），intern 後共用同一物件，
+    省記憶體並讓產業分組時的 dict 查詢以指標比較命中。
+    非 str（None、yfinance 偶爾回傳的 float nan 等）原樣回傳。
+    """
+    return sys.intern(value) if isinstance(value, str) and value else value
+
+
+@dataclass(slots=True)
 class TickerMetrics:
     """Raw financial metrics for a single ticker."""
 
@@ -60,6 +75,10 @@ class TickerMetrics:
             "fetch_error": self.fetch_error,
         }
 
+    def to_summary_dict(self) -> dict:
+        """篩選結果 JSON 內嵌的指標摘要（結果檔與前端使用的欄位子集）。"""
+        return dict(zip(_SUMMARY_FIELDS, _summary_values(self)))
+
     @classmethod
     def from_dict(cls, data: dict) -> "TickerMetrics":
         """從字典反序列化為 TickerMetrics，使用 get() 確保向後相容。"""
@@ -74,14 +93,96 @@ class TickerMetrics:
             book_value=data.get("book_value"),
             current_price=data.get("current_price"),
             earnings_growth=data.get("earnings_growth"),
-            sector=data.get("sector"),
-            industry=data.get("industry"),
+            sector=_intern(data.get("sector")),
+            industry=_intern(data.get("industry")),
             market_cap=data.get("market_cap"),
             company_name=data.get("company_name"),
             fetch_error=data.get("fetch_error"),
         )
 
 
+# 篩選結果內嵌的指標摘要欄位（順序即 JSON 輸出順序）
+_SUMMARY_FIELDS = (
+    "trailing_pe",
+    "peg_ratio",
+    "roe",
+    "debt_to_equity",
+    "trailing_eps",
+    "book_value",
+    "sector",
+    "industry",
+    "company_name",
+)
+_summary_values = attrgetter(*_SUMMARY_FIELDS)
+
+# MetricsFrame 欄位名稱 → TickerMetrics 屬性
+_FRAME_COLUMNS: dict[str, str] = {
+    "pe": "trailing_pe",
+    "peg": "peg_ratio",
+    "roe": "roe",
+    "de": "debt_to_equity",
+    "eps": "trailing_eps",
+    "bv": "book_value",
+    "price": "current_price",
+}
+_frame_row = attrgetter(*_FRAME_COLUMNS.values())
+
+
+@dataclass(slots=True)
+class MetricsFrame:
+    """
+    批次指標的欄位式（SoA）表示，供向量化篩選使用。
+
+    每個數值欄位為長度 N 的 float64 陣列（缺值為 NaN），
+    valid 為對應 TickerMetrics.is_valid 的布林遮罩，順序與 symbols 一致。
+    """
+
+    symbols: list[str]
+    pe: np.ndarray
+    peg: np.ndarray
+    roe: np.ndarray
+    de: np.ndarray
+    eps: np.ndarray
+    bv: np.ndarray
+    price: np.ndarray
+    valid: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @classmethod
+    def from_metrics(cls, metrics_list: list[TickerMetrics]) -> "MetricsFrame":
+        """單次走訪將 TickerMetrics 列表轉為欄位陣列（None 轉為 NaN）。"""
+        n = len(metrics_list)
+        table = np.array(
+            [_frame_row(m) for m in metrics_list], dtype=np.float64,
+        ).reshape(n, len(_FRAME_COLUMNS))
+        columns = np.ascontiguousarray(table.T)
+        valid = np.fromiter(
+            (m.is_valid for m in metrics_list), dtype=bool, count=n,
+        )
+        return cls(
+            [m.symbol for m in metrics_list],
+            *columns,
+            valid=valid,
+        )
+
+    def take(self, indices: np.ndarray) -> "MetricsFrame":
+        """依整數索引取出子集（例如單一產業），各欄位以 fancy indexing 複製。"""
+        symbols = self.symbols
+        return MetricsFrame(
+            [symbols[i] for i in indices.tolist()],
+            self.pe[indices],
+            self.peg[indices],
+            self.roe[indices],
+            self.de[indices],
+            self.eps[indices],
+            self.bv[indices],
+            self.price[indices],
+            self.valid[indices],
+        )
+
+
 def _fetch_from_yfinance(
     symbol: str,
     retry_count: int = 2,
@@ -126,8 +227,8 @@ def _fetch_from_yfinance(
                 book_value=info.get("bookValue"),
                 current_price=info.get("currentPrice"),
                 earnings_growth=earnings_growth,
-                sector=info.get("sector"),
-                industry=info.get("industry"),
+                sector=_intern(info.get("sector")),
+                industry=_intern(info.get("industry")),
                 market_cap=info.get("marketCap"),
                 company_name=info.get("shortName"),
             )
@@ -200,11 +301,22 @@ def fetch_batch_metrics(
     delay_between: float = 0.1,
     progress_callback=None,
     use_cache: bool = True,
+    max_workers: int = 8,
+    batch_size: int = 100,
 ) -> list[TickerMetrics]:
     """
     批次抓取指標，自動使用快取。
 
-    快取最佳化：載入一次 → 篩選需抓取的標的 → 抓取 → 合併 → 存檔一次。
+    快取最佳化：載入一次 → 篩選需抓取的標的 → 並行抓取 → 合併 → 存檔一次。
+
+    Args:
+        symbols: 股票代碼列表
+        delay_between: 相鄰兩支股票抓取起點的最小間隔（秒），並行時仍全域生效
+        progress_callback: 進度回呼函數 callback(current, total)
+        use_cache: 是否使用本地快取
+        max_workers: 並行抓取的執行緒數（1 = 循序抓取）
+        batch_size: 每完成幾筆抓取就將快取寫回磁碟（0 = 僅在結束時存檔），
+            長時間執行中斷時已抓取的資料不會遺失
     """
     from scripts.scanner.metrics_cache import MetricsCache
 
@@ -232,21 +344,39 @@ def fetch_batch_metrics(
             cache_hits, len(fetch_needed), total,
         )
 
-    # 第二階段：從 API 抓取缺失/過期的資料
+    # 第二階段：從 API 並行抓取缺失/過期的資料
+    # I/O 密集（HTTP 往返），以執行緒池重疊等待時間；節流器控制整體請求速率
     fetched_results: list[tuple[int, TickerMetrics]] = []
-    for fetch_idx, (original_idx, symbol) in enumerate(fetch_needed):
-        metrics = _fetch_from_yfinance(symbol)
-        fetched_results.append((original_idx, metrics))
+    if fetch_needed:
+        limiter = RateLimiter(delay_between)
 
-        if cache:
-            cache.put(metrics)
-
-        if progress_callback:
-            # 進度 = 快取命中數 + 已抓取數
-            progress_callback(cache_hits + fetch_idx + 1, total)
+        def _worker(symbol: str) -> TickerMetrics:
+            limiter.wait()
+            return _fetch_from_yfinance(symbol)
 
-        if fetch_idx < len(fetch_needed) - 1:
-            time.sleep(delay_between)
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        try:
+            futures = {
+                executor.submit(_worker, symbol): original_idx
+                for original_idx, symbol in fetch_needed
+            }
+            # 快取寫入與進度回報都在主執行緒完成，MetricsCache 不需加鎖
+            for done, future in enumerate(as_completed(futures), 1):
+                metrics = future.result()
+                fetched_results.append((futures[future], metrics))
+
+                if cache:
+                    cache.put(metrics)
+                    if batch_size > 0 and done % batch_size == 0:
+                        cache.save()
+
+                if progress_callback:
+                    # 進度 = 快取命中數 + 已完成抓取數
+                    progress_callback(cache_hits + done, total)
+        finally:
+            # 正常結束時所有 future 皆已完成；Ctrl-C 或例外時取消佇列中尚未開始的
+            # 抓取並立即返回，不必等整份清單跑完（with 區塊的 shutdown 會一直等）
+            executor.shutdown(wait=False, cancel_futures=True)
 
     # 快取命中的部分也要報告進度（一次性跳到命中數）
     if cache and cache_hits > 0 and progress_callback and len(fetch_needed) == 0:
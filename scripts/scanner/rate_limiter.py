@@ -0,0 +1,35 @@
+"""
+Yahoo Finance 抓取節流。
+
+Layer 1 指標抓取、Layer 3 深度抓取與價格預抓共用同一套節流器。
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    多執行緒共用的抓取節流器。
+
+    確保任意兩支股票的抓取起點至少相隔 interval 秒，讓並行抓取時每秒
+    開始抓取的股票數仍不超過 1 / interval（Yahoo Finance 流量限制）。
+    只管抓取起點：單支股票內的多次請求，以及抓取失敗後的退避重試，
+    都不再經過節流器。
+    """
+
+    def __init__(self, interval: float):
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        """阻塞直到輪到本次抓取的時間槽。"""
+        if self._interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
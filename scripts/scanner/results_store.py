@@ -43,17 +43,30 @@ def save_screening_results(
     if results and hasattr(results[0], "screening_mode"):
         screening_mode = "dual_track"
 
-    payload = {
+    header = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "tag": tag,
         "screening_mode": screening_mode,
         "total_screened": len(results),
         "total_passed": sum(1 for r in results if r.passed),
-        "results": [r.to_dict() for r in results],
     }
 
-    with open(filepath, "w") as f:
-        json.dump(payload, f, indent=2, default=str)
+    # 逐筆序列化寫入暫存檔再原子替換：同一時間只有一筆結果的 dict 存在，
+    # 不需先組出完整的 results 列表。
+    # 每筆結果壓縮為單行：標準庫 json 只在 indent=None 時使用 C 編碼器，
+    # 比 indent=2 的純 Python 路徑快數倍；整體仍是合法 JSON，且一行一筆便於閱讀
+    encoder = json.JSONEncoder(default=str, check_circular=False)
+    tmp_path = filepath.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        f.write("{\n")
+        for key, value in header.items():
+            f.write(f"  {json.dumps(key)}: {encoder.encode(value)},\n")
+        f.write('  "results": [')
+        for i, r in enumerate(results):
+            f.write(",\n    " if i else "\n    ")
+            f.write(encoder.encode(r.to_dict()))
+        f.write("\n  ]\n}" if results else "]\n}")
+    tmp_path.replace(filepath)
 
     return filepath
 
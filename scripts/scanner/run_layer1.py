@@ -9,9 +9,14 @@ Usage:
 
 import argparse
 import logging
+import sys
+import time
+from collections import Counter
+from io import StringIO
 
 from scripts.scanner.config import DEFAULT_THRESHOLDS, DEFAULT_SECTOR_THRESHOLDS
 from scripts.scanner.data_fetcher import fetch_batch_metrics
+from scripts.scanner.metrics_cache import MetricsCache
 from scripts.scanner.screener import screen_batch
 from scripts.scanner.sector_screener import screen_batch_dual_track
 from scripts.scanner.results_store import save_screening_results
@@ -29,19 +34,41 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def _progress(current: int, total: int):
-    pct = current / total * 100
-    print(f"\r  Fetching: {current}/{total} ({pct:.0f}%)", end="", flush=True)
-    if current == total:
-        print()
+def _make_progress(min_interval: float = 0.1):
+    """
+    建立節流後的進度回呼：最多每 min_interval 秒重繪一次，最後一筆必定輸出。
+
+    快取命中時回呼頻率極高，逐筆格式化並 flush 反而成為瓶頸。
+    """
+    last_emit = float("-inf")
+
+    def _progress(current: int, total: int):
+        nonlocal last_emit
+        now = time.monotonic()
+        if current != total and now - last_emit < min_interval:
+            return
+        last_emit = now
+        pct = current / total * 100
+        print(f"\r  Fetching: {current}/{total} ({pct:.0f}%)", end="", flush=True)
+        if current == total:
+            print()
+
+    return _progress
+
+
+def _flush_output(buf: StringIO) -> None:
+    """將緩衝的報表一次寫出，避免逐行 print 的多次寫入與 flush。"""
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
 
 
 def _print_absolute_results(results):
     """印出絕對門檻模式的篩選結果。"""
     passed = [r for r in results if r.passed]
+    buf = StringIO()
 
     if passed:
-        print("\n=== PASSED SCREENING (Absolute Mode) ===")
+        print("\n=== PASSED SCREENING (Absolute Mode) ===", file=buf)
         for r in passed:
             mos = (
                 f"MOS: {r.margin_of_safety_pct:.1f}%"
@@ -56,18 +83,22 @@ def _print_absolute_results(results):
             print(
                 f"  {r.symbol:8s} | PE={pe} | PEG={peg} | "
                 f"ROE={r.metrics.roe:.1%} | D/E={r.metrics.debt_to_equity:.2f} | "
-                f"{graham} | {mos}"
+                f"{graham} | {mos}",
+                file=buf,
             )
     else:
-        print("\nNo tickers passed all screening criteria.")
+        print("\nNo tickers passed all screening criteria.", file=buf)
+
+    _flush_output(buf)
 
 
 def _print_dual_results(results):
     """印出雙軌制模式的篩選結果，含產業分布和百分位資訊。"""
     passed = [r for r in results if r.passed]
+    buf = StringIO()
 
     if passed:
-        print("\n=== PASSED SCREENING (Dual-Track Mode) ===")
+        print("\n=== PASSED SCREENING (Dual-Track Mode) ===", file=buf)
         for r in passed:
             mos = (
                 f"MOS: {r.margin_of_safety_pct:.1f}%"
@@ -98,27 +129,27 @@ def _print_dual_results(results):
             print(
                 f"  {r.symbol:8s} | {sector:25s} | PE={pe_str} | PEG={peg_str} | "
                 f"ROE={roe_str} | D/E={de_str} | "
-                f"{graham} | {mos}"
+                f"{graham} | {mos}",
+                file=buf,
             )
 
         # 產業分布摘要
-        print("\n=== 產業分布 ===")
+        print("\n=== 產業分布 ===", file=buf)
         # 收集所有有效結果的產業分布
         all_valid = [r for r in results if r.metrics and r.metrics.sector]
-        sector_stats: dict[str, dict] = {}
-        for r in all_valid:
-            sector = r.metrics.sector
-            if sector not in sector_stats:
-                sector_stats[sector] = {"screened": 0, "passed": 0}
-            sector_stats[sector]["screened"] += 1
-            if r.passed:
-                sector_stats[sector]["passed"] += 1
-
-        for sector in sorted(sector_stats.keys()):
-            s = sector_stats[sector]
-            print(f"  {sector:30s}: {s['passed']:>3d} 通過 / {s['screened']:>4d} 篩選")
+        screened = Counter(r.metrics.sector for r in all_valid)
+        passed_count = Counter(r.metrics.sector for r in all_valid if r.passed)
+
+        for sector in sorted(screened):
+            print(
+                f"  {sector:30s}: {passed_count[sector]:>3d} 通過 / "
+                f"{screened[sector]:>4d} 篩選",
+                file=buf,
+            )
     else:
-        print("\nNo tickers passed dual-track screening criteria.")
+        print("\nNo tickers passed dual-track screening criteria.", file=buf)
+
+    _flush_output(buf)
 
 
 def main():
@@ -144,12 +175,30 @@ def main():
         default=0.1,
         help="Delay between API calls in seconds (default: 0.1)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="並行抓取的執行緒數（預設: 8，設為 1 則循序抓取）",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="每抓取幾筆就將快取寫回磁碟（預設: 100，設為 0 則僅在結束時存檔）",
+    )
     parser.add_argument(
         "--force-refresh",
         action="store_true",
         default=False,
         help="強制重新抓取所有資料，忽略本地快取（預設使用 24 小時快取）",
     )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        default=False,
+        help="執行前清空本地指標快取檔案",
+    )
     args = parser.parse_args()
 
     # 取得股票代碼清單
@@ -179,6 +228,12 @@ def main():
             len(tickers), DEFAULT_SECTOR_THRESHOLDS,
         )
 
+    if args.clear_cache:
+        cache = MetricsCache()
+        cache.clear()
+        cache.save()
+        logger.info("已清空本地指標快取 (--clear-cache)")
+
     use_cache = not args.force_refresh
     if args.force_refresh:
         logger.info("快取已停用 (--force-refresh)")
@@ -187,8 +242,9 @@ def main():
 
     logger.info("Phase 1/2: Fetching financial data...")
     metrics_list = fetch_batch_metrics(
-        tickers, delay_between=args.delay, progress_callback=_progress,
-        use_cache=use_cache,
+        tickers, delay_between=args.delay, progress_callback=_make_progress(),
+        use_cache=use_cache, max_workers=args.workers,
+        batch_size=args.batch_size,
     )
 
     fetch_errors = sum(1 for m in metrics_list if m.fetch_error)
@@ -9,20 +9,38 @@ Screens stocks against configurable financial thresholds:
 """
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Any, Optional
 import logging
+import math
+
+import numpy as np
 
 from scripts.scanner.config import (
     ScreeningThresholds,
     DEFAULT_THRESHOLDS,
     calculate_graham_number,
 )
-from scripts.scanner.data_fetcher import TickerMetrics
+from scripts.scanner.data_fetcher import MetricsFrame, TickerMetrics
 
 logger = logging.getLogger(__name__)
 
+# 失敗原因代碼 → 顯示文字樣板；value 為實際值，limit 為門檻
+_FAIL_REASON_TEMPLATES: dict[str, str] = {
+    "PE_HIGH": "P/E {value:.1f} >= {limit}",
+    "PE_MISSING": "P/E ratio unavailable",
+    "PEG_HIGH": "PEG {value:.2f} >= {limit}",
+    "PEG_MISSING": "PEG ratio unavailable",
+    "ROE_LOW": "ROE {value:.2%} < {limit:.0%}",
+    "ROE_MISSING": "ROE unavailable",
+    "DE_HIGH": "D/E {value:.2f} > {limit}",
+    "DE_MISSING": "Debt/Equity unavailable",
+    "INVALID_DATA": "Invalid data: {value}",
+}
+
+FailCode = tuple[str, Any, Any]
 
-@dataclass
+
+@dataclass(slots=True)
 class ScreeningResult:
     """Result of screening a single ticker."""
 
@@ -32,7 +50,15 @@ class ScreeningResult:
     current_price: Optional[float] = None
     margin_of_safety_pct: Optional[float] = None
     metrics: Optional[TickerMetrics] = None
-    fail_reasons: list[str] = field(default_factory=list)
+    fail_codes: list[FailCode] = field(default_factory=list)
+
+    @property
+    def fail_reasons(self) -> list[str]:
+        """失敗原因文字，由 fail_codes 於讀取時才格式化。"""
+        return [
+            _FAIL_REASON_TEMPLATES[code].format(value=value, limit=limit)
+            for code, value, limit in self.fail_codes
+        ]
 
     def to_dict(self) -> dict:
         """Serialize for JSON output."""
@@ -43,77 +69,75 @@ class ScreeningResult:
             "current_price": self.current_price,
             "margin_of_safety_pct": self.margin_of_safety_pct,
             "fail_reasons": self.fail_reasons,
-            "metrics": {
-                "trailing_pe": self.metrics.trailing_pe,
-                "peg_ratio": self.metrics.peg_ratio,
-                "roe": self.metrics.roe,
-                "debt_to_equity": self.metrics.debt_to_equity,
-                "trailing_eps": self.metrics.trailing_eps,
-                "book_value": self.metrics.book_value,
-                "sector": self.metrics.sector,
-                "industry": self.metrics.industry,
-                "company_name": self.metrics.company_name,
-            }
+            "metrics": self.metrics.to_summary_dict()
             if self.metrics
             else None,
         }
 
 
-def screen_ticker(
+def _collect_fail_codes(
     metrics: TickerMetrics,
-    thresholds: ScreeningThresholds = DEFAULT_THRESHOLDS,
-) -> ScreeningResult:
-    """
-    Apply Layer 1 quantitative filters to a single ticker.
-
-    A ticker passes if ALL filters pass. Missing data causes failure
-    (conservative approach).
-    """
-    if not metrics.is_valid:
-        return ScreeningResult(
-            symbol=metrics.symbol,
-            passed=False,
-            fail_reasons=[f"Invalid data: {metrics.fetch_error}"],
-            metrics=metrics,
-        )
-
-    fail_reasons = []
+    thresholds: ScreeningThresholds,
+) -> list[FailCode]:
+    """逐項檢查四個篩選條件，回傳未通過的原因代碼（全部通過則為空列表）。"""
+    fail_codes: list[FailCode] = []
 
     # Filter 1: P/E Ratio
     if metrics.trailing_pe is not None:
         if metrics.trailing_pe >= thresholds.pe_ratio_max:
-            fail_reasons.append(
-                f"P/E {metrics.trailing_pe:.1f} >= {thresholds.pe_ratio_max}"
+            fail_codes.append(
+                ("PE_HIGH", metrics.trailing_pe, thresholds.pe_ratio_max)
             )
     else:
-        fail_reasons.append("P/E ratio unavailable")
+        fail_codes.append(("PE_MISSING", None, None))
 
     # Filter 2: PEG Ratio
     if metrics.peg_ratio is not None:
         if metrics.peg_ratio >= thresholds.peg_ratio_max:
-            fail_reasons.append(
-                f"PEG {metrics.peg_ratio:.2f} >= {thresholds.peg_ratio_max}"
+            fail_codes.append(
+                ("PEG_HIGH", metrics.peg_ratio, thresholds.peg_ratio_max)
             )
     else:
-        fail_reasons.append("PEG ratio unavailable")
+        fail_codes.append(("PEG_MISSING", None, None))
 
     # Filter 3: ROE
     if metrics.roe is not None:
         if metrics.roe < thresholds.roe_min:
-            fail_reasons.append(
-                f"ROE {metrics.roe:.2%} < {thresholds.roe_min:.0%}"
-            )
+            fail_codes.append(("ROE_LOW", metrics.roe, thresholds.roe_min))
     else:
-        fail_reasons.append("ROE unavailable")
+        fail_codes.append(("ROE_MISSING", None, None))
 
     # Filter 4: Debt/Equity
     if metrics.debt_to_equity is not None:
         if metrics.debt_to_equity > thresholds.debt_to_equity_max:
-            fail_reasons.append(
-                f"D/E {metrics.debt_to_equity:.2f} > {thresholds.debt_to_equity_max}"
+            fail_codes.append(
+                ("DE_HIGH", metrics.debt_to_equity, thresholds.debt_to_equity_max)
             )
     else:
-        fail_reasons.append("Debt/Equity unavailable")
+        fail_codes.append(("DE_MISSING", None, None))
+
+    return fail_codes
+
+
+def screen_ticker(
+    metrics: TickerMetrics,
+    thresholds: ScreeningThresholds = DEFAULT_THRESHOLDS,
+) -> ScreeningResult:
+    """
+    Apply Layer 1 quantitative filters to a single ticker.
+
+    A ticker passes if ALL filters pass. Missing data causes failure
+    (conservative approach).
+    """
+    if not metrics.is_valid:
+        return ScreeningResult(
+            symbol=metrics.symbol,
+            passed=False,
+            fail_codes=[("INVALID_DATA", metrics.fetch_error, None)],
+            metrics=metrics,
+        )
+
+    fail_codes = _collect_fail_codes(metrics, thresholds)
 
     # Graham Number (informational, not a filter)
     graham = None
@@ -127,7 +151,7 @@ def screen_ticker(
         if graham and metrics.current_price:
             mos_pct = (graham - metrics.current_price) / graham * 100
 
-    passed = len(fail_reasons) == 0
+    passed = len(fail_codes) == 0
 
     return ScreeningResult(
         symbol=metrics.symbol,
@@ -136,26 +160,114 @@ def screen_ticker(
         current_price=metrics.current_price,
         margin_of_safety_pct=mos_pct,
         metrics=metrics,
-        fail_reasons=fail_reasons,
+        fail_codes=fail_codes,
     )
 
 
+def _nan_to_none(value: float) -> Optional[float]:
+    """NaN 轉回 None，與 screen_ticker 的輸出一致。"""
+    return None if math.isnan(value) else value
+
+
+def _graham_mos_kernel(
+    eps: np.ndarray,
+    bv: np.ndarray,
+    price: np.ndarray,
+    multiplier: float,
+    mask: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    批次計算葛拉漢數與安全邊際（%），無定義處為 NaN。
+
+    EPS 與每股淨值皆為正才有葛拉漢數；安全邊際另需非零股價。
+    以預先配置的輸出陣列搭配 ufunc 的 out/where 原地運算，
+    避免 np.where 產生的中間暫存陣列。
+    """
+    n = len(eps)
+    graham = np.full(n, np.nan)
+    mos = np.full(n, np.nan)
+
+    has_graham = mask & (eps > 0) & (bv > 0)
+    np.multiply(eps, multiplier, out=graham, where=has_graham)
+    np.multiply(graham, bv, out=graham, where=has_graham)
+    np.sqrt(graham, out=graham, where=has_graham)
+
+    has_mos = has_graham & ~np.isnan(price) & (price != 0)
+    np.subtract(graham, price, out=mos, where=has_mos)
+    np.divide(mos, graham, out=mos, where=has_mos)
+    np.multiply(mos, 100, out=mos, where=has_mos)
+
+    return graham, mos
+
+
 def screen_batch(
     metrics_list: list[TickerMetrics],
     thresholds: ScreeningThresholds = DEFAULT_THRESHOLDS,
 ) -> list[ScreeningResult]:
     """
     Screen a batch of tickers. Returns all results sorted:
-    passed first (by margin of safety desc), then failed.
+    passed first (by margin of safety desc), then failed (in input order).
+
+    資料無效者先行分離；其餘轉為欄位式的 MetricsFrame，篩選條件與葛拉漢數
+    以 NumPy 陣列一次算完（NaN 比較恆為 False，缺失資料自然判定為未通過），
+    僅未通過者才逐項記錄失敗原因代碼。
+    結果與逐支呼叫 screen_ticker 相同。
     """
-    results = [screen_ticker(m, thresholds) for m in metrics_list]
+    # 資料無效者直接判定失敗，不進入向量化計算；結果先依輸入順序放回原位
+    ordered: list[Optional[ScreeningResult]] = [None] * len(metrics_list)
+    valid_positions: list[int] = []
+    valid_metrics: list[TickerMetrics] = []
+    for pos, m in enumerate(metrics_list):
+        if m.is_valid:
+            valid_positions.append(pos)
+            valid_metrics.append(m)
+        else:
+            ordered[pos] = ScreeningResult(
+                symbol=m.symbol,
+                passed=False,
+                metrics=m,
+                fail_codes=[("INVALID_DATA", m.fetch_error, None)],
+            )
 
-    passed = [r for r in results if r.passed]
-    failed = [r for r in results if not r.passed]
+    frame = MetricsFrame.from_metrics(valid_metrics)
+
+    pass_mask = (
+        (frame.pe < thresholds.pe_ratio_max)
+        & (frame.peg < thresholds.peg_ratio_max)
+        & (frame.roe >= thresholds.roe_min)
+        & (frame.de <= thresholds.debt_to_equity_max)
+    )
 
-    passed.sort(
-        key=lambda r: r.margin_of_safety_pct or -999,
-        reverse=True,
+    graham, mos = _graham_mos_kernel(
+        frame.eps, frame.bv, frame.price, thresholds.graham_multiplier, frame.valid,
     )
 
+    graham_values = graham.tolist()
+    mos_values = mos.tolist()
+    pass_flags = pass_mask.tolist()
+
+    results: list[ScreeningResult] = []
+    for i, metrics in enumerate(valid_metrics):
+        is_passed = pass_flags[i]
+        result = ScreeningResult(
+            symbol=metrics.symbol,
+            passed=is_passed,
+            graham_number=_nan_to_none(graham_values[i]),
+            current_price=metrics.current_price,
+            margin_of_safety_pct=_nan_to_none(mos_values[i]),
+            metrics=metrics,
+            fail_codes=[] if is_passed else _collect_fail_codes(metrics, thresholds),
+        )
+        results.append(result)
+        ordered[valid_positions[i]] = result
+
+    # 通過者依安全邊際降序（缺值或 0 視為 -999，與原本的 `or -999` 一致）
+    passed_idx = np.flatnonzero(pass_mask)
+    sort_key = np.where(np.isnan(mos) | (mos == 0), -999.0, mos)[passed_idx]
+    passed_order = passed_idx[np.argsort(-sort_key, kind="stable")]
+
+    passed = [results[i] for i in passed_order.tolist()]
+    # 未通過者（含資料無效）維持輸入順序
+    failed = [r for r in ordered if not r.passed]
+
     return passed + failed
@@ -10,15 +10,19 @@ Track 2（安全底線）：寬鬆的絕對門檻，排除明顯不健康的極
 """
 
 from dataclasses import dataclass, field
+from functools import lru_cache
+from operator import attrgetter
 from typing import Optional
 import logging
 
+import numpy as np
+
 from scripts.scanner.config import (
     SectorRelativeThresholds,
     DEFAULT_SECTOR_THRESHOLDS,
-    calculate_graham_number,
 )
-from scripts.scanner.data_fetcher import TickerMetrics
+from scripts.scanner.data_fetcher import MetricsFrame, TickerMetrics
+from scripts.scanner.screener import FailCode, _graham_mos_kernel, _nan_to_none
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +30,50 @@ logger = logging.getLogger(__name__)
 # ── 資料結構 ──────────────────────────────────────────
 
 
-@dataclass
+# 失敗原因代碼 → 顯示文字樣板（兩段式）
+# 第一段代入門檻 limit（同一門檻只做一次），第二段才代入實際值 value
+_FAIL_REASON_TEMPLATES: dict[str, str] = {
+    "SAFETY_PE": "P/E {{value:.1f}} >= 安全上限 {limit}",
+    "SAFETY_PEG": "PEG {{value:.2f}} >= 安全上限 {limit}",
+    "SAFETY_ROE": "ROE {{value:.2%}} < 安全下限 {limit:.0%}",
+    "SAFETY_DE": "D/E {{value:.2f}} > 安全上限 {limit}",
+    "SECTOR_PERCENTILE": "未通過產業內百分位排名篩選",
+    "FETCH_ERROR": "資料抓取失敗: {{value}}",
+}
+
+
+@lru_cache(maxsize=64, typed=True)
+def _bound_template(code: str, limit) -> str:
+    """回傳已代入門檻的樣板，門檻在批次內固定故可快取。
+
+    typed=True：50 與 50.0 的顯示文字不同，不可共用同一快取項。
+    """
+    return _FAIL_REASON_TEMPLATES[code].format(limit=limit)
+
+
+_SECTOR_PERCENTILE_FAIL: FailCode = ("SECTOR_PERCENTILE", None, None)
+
+
+def _format_fail_codes(fail_codes: list[FailCode]) -> list[str]:
+    """將失敗原因代碼格式化為顯示文字。"""
+    return [
+        _bound_template(code, limit).format(value=value)
+        for code, value, limit in fail_codes
+    ]
+
+
+_PERCENTILE_FIELDS = (
+    "pe_percentile",
+    "peg_percentile",
+    "roe_percentile",
+    "de_percentile",
+    "sector",
+    "sector_count",
+)
+_percentile_values = attrgetter(*_PERCENTILE_FIELDS)
+
+
+@dataclass(slots=True)
 class SectorPercentiles:
     """個股在產業內的百分位排名（0.0=最佳, 1.0=最差）。"""
 
@@ -37,8 +84,12 @@ class SectorPercentiles:
     sector: str = ""
     sector_count: int = 0
 
+    def to_dict(self) -> dict:
+        """序列化為 JSON 格式。"""
+        return dict(zip(_PERCENTILE_FIELDS, _percentile_values(self)))
+
 
-@dataclass
+@dataclass(slots=True)
 class SectorScreeningResult:
     """雙軌制篩選結果。"""
 
@@ -52,7 +103,7 @@ class SectorScreeningResult:
 
     # Track 2 結果
     passed_safety_filter: bool = False
-    safety_fail_reasons: list[str] = field(default_factory=list)
+    safety_fail_codes: list[FailCode] = field(default_factory=list)
 
     # 葛拉漢數
     graham_number: Optional[float] = None
@@ -61,7 +112,17 @@ class SectorScreeningResult:
 
     # 原始指標
     metrics: Optional[TickerMetrics] = None
-    fail_reasons: list[str] = field(default_factory=list)
+    fail_codes: list[FailCode] = field(default_factory=list)
+
+    @property
+    def safety_fail_reasons(self) -> list[str]:
+        """安全底線失敗原因文字，讀取時才格式化。"""
+        return _format_fail_codes(self.safety_fail_codes)
+
+    @property
+    def fail_reasons(self) -> list[str]:
+        """所有失敗原因文字，讀取時才格式化。"""
+        return _format_fail_codes(self.fail_codes)
 
     def to_dict(self) -> dict:
         """序列化為 JSON 格式。"""
@@ -73,30 +134,13 @@ class SectorScreeningResult:
             "current_price": self.current_price,
             "margin_of_safety_pct": self.margin_of_safety_pct,
             "fail_reasons": self.fail_reasons,
-            "sector_percentiles": {
-                "pe_percentile": self.sector_percentiles.pe_percentile,
-                "peg_percentile": self.sector_percentiles.peg_percentile,
-                "roe_percentile": self.sector_percentiles.roe_percentile,
-                "de_percentile": self.sector_percentiles.de_percentile,
-                "sector": self.sector_percentiles.sector,
-                "sector_count": self.sector_percentiles.sector_count,
-            }
+            "sector_percentiles": self.sector_percentiles.to_dict()
             if self.sector_percentiles
             else None,
             "passed_sector_filter": self.passed_sector_filter,
             "passed_safety_filter": self.passed_safety_filter,
             "safety_fail_reasons": self.safety_fail_reasons,
-            "metrics": {
-                "trailing_pe": self.metrics.trailing_pe,
-                "peg_ratio": self.metrics.peg_ratio,
-                "roe": self.metrics.roe,
-                "debt_to_equity": self.metrics.debt_to_equity,
-                "trailing_eps": self.metrics.trailing_eps,
-                "book_value": self.metrics.book_value,
-                "sector": self.metrics.sector,
-                "industry": self.metrics.industry,
-                "company_name": self.metrics.company_name,
-            }
+            "metrics": self.metrics.to_summary_dict()
             if self.metrics
             else None,
         }
@@ -105,122 +149,149 @@ class SectorScreeningResult:
 # ── 內部工具函數 ──────────────────────────────────────
 
 
-def _compute_metric_rank(
-    value: float,
-    all_values: list[float],
-    lower_is_better: bool,
-) -> float:
+def _sector_indices(metrics_list: list[TickerMetrics]) -> dict[str, np.ndarray]:
+    """按 GICS 產業分組，回傳各產業在 metrics_list 中的索引陣列。"""
+    positions: dict[str, list[int]] = {}
+    for i, m in enumerate(metrics_list):
+        positions.setdefault(m.sector or "Unknown", []).append(i)
+    return {
+        sector: np.asarray(idx, dtype=np.int64)
+        for sector, idx in positions.items()
+    }
+
+
+def _metric_ranks(values: np.ndarray, lower_is_better: bool) -> np.ndarray:
     """
-    計算正規化排名：0.0（最佳）到 1.0（最差）。
+    計算整個產業某指標的正規化排名：0.0（最佳）到 1.0（最差）。
 
-    公式：better_count / (N - 1)
+    公式：better_count / (N - 1)，N 為有效值數量
     - lower_is_better=True：比目標值嚴格更低的數量
     - lower_is_better=False：比目標值嚴格更高的數量
-    - Ties 得到相同排名
-    - 單一元素回傳 0.0
+    - Ties 得到相同排名（等同 rankdata(method="min")）
+    - values 以 NaN 表示缺值；缺值或有效值不足 2 個時對應位置為 NaN
+
+    排序一次後以二分搜尋取得每個值的名次，O(N log N)。
     """
-    n = len(all_values)
+    ranks = np.full(values.shape, np.nan)
+    present = ~np.isnan(values)
+    arr = values[present]
+    n = arr.size
     if n <= 1:
-        return 0.0
+        return ranks
+
+    sorted_arr = np.sort(arr)
     if lower_is_better:
-        better_count = sum(1 for v in all_values if v < value)
+        better_count = np.searchsorted(sorted_arr, arr, side="left")
     else:
-        better_count = sum(1 for v in all_values if v > value)
-    return better_count / (n - 1)
+        better_count = n - np.searchsorted(sorted_arr, arr, side="right")
+    ranks[present] = better_count / (n - 1)
+    return ranks
 
 
-def _group_by_sector(
-    metrics_list: list[TickerMetrics],
-) -> dict[str, list[TickerMetrics]]:
-    """按 GICS 產業分組，sector=None 歸入 'Unknown'。"""
-    groups: dict[str, list[TickerMetrics]] = {}
-    for m in metrics_list:
-        sector = m.sector or "Unknown"
-        groups.setdefault(sector, []).append(m)
-    return groups
+def _sector_rank_matrix(frame: MetricsFrame) -> np.ndarray:
+    """
+    產業內四個指標的排名矩陣，shape = (4, N)，列順序為 PE、PEG、ROE、D/E。
+    """
+    return np.vstack([
+        _metric_ranks(frame.pe, lower_is_better=True),
+        _metric_ranks(frame.peg, lower_is_better=True),
+        _metric_ranks(frame.roe, lower_is_better=False),
+        _metric_ranks(frame.de, lower_is_better=True),
+    ])
 
 
-def _calculate_sector_percentiles(
-    metrics: TickerMetrics,
+def _percentiles_from_ranks(
     sector_group: list[TickerMetrics],
-) -> SectorPercentiles:
-    """計算個股在產業內各指標的百分位排名。"""
-    sector = metrics.sector or "Unknown"
+    rank_matrix: np.ndarray,
+) -> list[SectorPercentiles]:
+    """將排名矩陣轉為與 sector_group 同序的 SectorPercentiles 列表（NaN → None）。"""
     sector_count = len(sector_group)
-
-    # 收集每個指標的有效值（排除 None）
-    pe_values = [m.trailing_pe for m in sector_group if m.trailing_pe is not None]
-    peg_values = [m.peg_ratio for m in sector_group if m.peg_ratio is not None]
-    roe_values = [m.roe for m in sector_group if m.roe is not None]
-    de_values = [m.debt_to_equity for m in sector_group if m.debt_to_equity is not None]
-
-    # 計算百分位（若目標值為 None 則該百分位也是 None）
-    pe_pct = None
-    if metrics.trailing_pe is not None and len(pe_values) > 1:
-        pe_pct = _compute_metric_rank(metrics.trailing_pe, pe_values, lower_is_better=True)
-
-    peg_pct = None
-    if metrics.peg_ratio is not None and len(peg_values) > 1:
-        peg_pct = _compute_metric_rank(metrics.peg_ratio, peg_values, lower_is_better=True)
-
-    roe_pct = None
-    if metrics.roe is not None and len(roe_values) > 1:
-        roe_pct = _compute_metric_rank(metrics.roe, roe_values, lower_is_better=False)
-
-    de_pct = None
-    if metrics.debt_to_equity is not None and len(de_values) > 1:
-        de_pct = _compute_metric_rank(metrics.debt_to_equity, de_values, lower_is_better=True)
-
-    return SectorPercentiles(
-        pe_percentile=pe_pct,
-        peg_percentile=peg_pct,
-        roe_percentile=roe_pct,
-        de_percentile=de_pct,
-        sector=sector,
-        sector_count=sector_count,
+    pe_pcts, peg_pcts, roe_pcts, de_pcts = (
+        [None if np.isnan(r) else r for r in row] for row in rank_matrix.tolist()
     )
+    return [
+        SectorPercentiles(
+            pe_percentile=pe_pcts[i],
+            peg_percentile=peg_pcts[i],
+            roe_percentile=roe_pcts[i],
+            de_percentile=de_pcts[i],
+            sector=metrics.sector or "Unknown",
+            sector_count=sector_count,
+        )
+        for i, metrics in enumerate(sector_group)
+    ]
+
+
+def _sector_pass_mask(rank_matrix: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Track 1 判定：至少一個指標有百分位，且所有非缺值的百分位都 <= 門檻。
+    """
+    missing = np.isnan(rank_matrix)
+    within = missing | (rank_matrix <= threshold)
+    return within.all(axis=0) & ~missing.all(axis=0)
 
 
-def _apply_safety_filter(
+def _collect_safety_codes(
     metrics: TickerMetrics,
     thresholds: SectorRelativeThresholds = DEFAULT_SECTOR_THRESHOLDS,
-) -> tuple[bool, list[str]]:
+) -> list[FailCode]:
     """
-    寬鬆安全底線篩選（Track 2）。
+    寬鬆安全底線篩選（Track 2），回傳未通過項目的失敗原因代碼。
 
     只過濾明顯極端的數值，缺失資料不導致失敗。
     """
-    fail_reasons: list[str] = []
+    fail_codes: list[FailCode] = []
 
     # P/E 安全上限
     if metrics.trailing_pe is not None:
         if metrics.trailing_pe >= thresholds.safety_pe_max:
-            fail_reasons.append(
-                f"P/E {metrics.trailing_pe:.1f} >= 安全上限 {thresholds.safety_pe_max}"
+            fail_codes.append(
+                ("SAFETY_PE", metrics.trailing_pe, thresholds.safety_pe_max)
             )
 
     # PEG 安全上限
     if metrics.peg_ratio is not None:
         if metrics.peg_ratio >= thresholds.safety_peg_max:
-            fail_reasons.append(
-                f"PEG {metrics.peg_ratio:.2f} >= 安全上限 {thresholds.safety_peg_max}"
+            fail_codes.append(
+                ("SAFETY_PEG", metrics.peg_ratio, thresholds.safety_peg_max)
             )
 
     # ROE 安全下限
     if metrics.roe is not None:
         if metrics.roe < thresholds.safety_roe_min:
-            fail_reasons.append(
-                f"ROE {metrics.roe:.2%} < 安全下限 {thresholds.safety_roe_min:.0%}"
-            )
+            fail_codes.append(("SAFETY_ROE", metrics.roe, thresholds.safety_roe_min))
 
     # D/E 安全上限
     if metrics.debt_to_equity is not None:
         if metrics.debt_to_equity > thresholds.safety_de_max:
-            fail_reasons.append(
-                f"D/E {metrics.debt_to_equity:.2f} > 安全上限 {thresholds.safety_de_max}"
+            fail_codes.append(
+                ("SAFETY_DE", metrics.debt_to_equity, thresholds.safety_de_max)
             )
 
-    return len(fail_reasons) == 0, fail_reasons
+    return fail_codes
+
+
+def _safety_pass_mask(
+    frame: MetricsFrame,
+    thresholds: SectorRelativeThresholds = DEFAULT_SECTOR_THRESHOLDS,
+) -> np.ndarray:
+    """
+    整個產業一次判定安全底線（Track 2），條件同 _collect_safety_codes。
+
+    NaN 的比較結果恆為 False，缺失資料自然不導致失敗。
+    """
+    failed = (
+        (frame.pe >= thresholds.safety_pe_max)
+        | (frame.peg >= thresholds.safety_peg_max)
+        | (frame.roe < thresholds.safety_roe_min)
+        | (frame.de > thresholds.safety_de_max)
+    )
+    return ~failed
+
+
+def _mos_sort_key(result: SectorScreeningResult) -> float:
+    """排序鍵：安全邊際，缺值（或 0）視為 -999 排到最後。"""
+    return result.margin_of_safety_pct or -999
 
 
 # ── 主要入口函數 ──────────────────────────────────────
@@ -234,84 +305,81 @@ def screen_batch_dual_track(
     雙軌制批次篩選：產業內百分位排名 + 安全底線。
 
     流程：
-    1. 按產業分組
-    2. 對每支股票計算產業內百分位
+    1. 建立整體欄位式視圖，按產業取得索引陣列
+    2. 每個產業一次算出所有股票的產業內百分位
     3. 同時執行 Track 1（百分位）和 Track 2（安全底線）
     4. 兩者都通過才算最終通過
-    5. 產業 < min_sector_size → 僅用安全底線
+    5. 產業 < min_sector_size → 僅用安全底線，不計算百分位
 
     排序：通過的按安全邊際降序，失敗的排後面。
     """
-    # 過濾掉抓取失敗的股票
-    valid_metrics = [m for m in metrics_list if m.is_valid]
-    invalid_metrics = [m for m in metrics_list if not m.is_valid]
-
-    # 按產業分組
-    sector_groups = _group_by_sector(valid_metrics)
-    results: list[SectorScreeningResult] = []
-
-    for sector, group in sector_groups.items():
-        use_sector_filter = len(group) >= thresholds.min_sector_size
-
-        for metrics in group:
-            # Track 2：安全底線
-            safety_passed, safety_reasons = _apply_safety_filter(metrics, thresholds)
-
-            # Track 1：產業百分位
-            percentiles = _calculate_sector_percentiles(metrics, group)
-            sector_passed = False
-
-            if use_sector_filter:
-                screening_mode = "dual_track"
-                # 所有非 None 百分位都必須 <= 門檻才算通過
-                pct_checks = []
-                if percentiles.pe_percentile is not None:
-                    pct_checks.append(
-                        percentiles.pe_percentile <= thresholds.sector_percentile_threshold
-                    )
-                if percentiles.peg_percentile is not None:
-                    pct_checks.append(
-                        percentiles.peg_percentile <= thresholds.sector_percentile_threshold
-                    )
-                if percentiles.roe_percentile is not None:
-                    pct_checks.append(
-                        percentiles.roe_percentile <= thresholds.sector_percentile_threshold
-                    )
-                if percentiles.de_percentile is not None:
-                    pct_checks.append(
-                        percentiles.de_percentile <= thresholds.sector_percentile_threshold
-                    )
-
-                # 至少要有 1 個指標有百分位，且全部通過
-                sector_passed = len(pct_checks) > 0 and all(pct_checks)
-            else:
-                # 產業太小，跳過百分位篩選
-                screening_mode = "safety_only"
-                sector_passed = True  # 不使用 sector filter，視為通過
+    # 過濾掉抓取失敗的股票（單次走訪分流）
+    valid_metrics: list[TickerMetrics] = []
+    invalid_metrics: list[TickerMetrics] = []
+    for m in metrics_list:
+        (valid_metrics if m.is_valid else invalid_metrics).append(m)
+
+    # 整個 universe 只建立一次欄位式視圖，各產業以索引陣列取出子集
+    universe_frame = MetricsFrame.from_metrics(valid_metrics)
+    universe_safety = _safety_pass_mask(universe_frame, thresholds)
+    # 葛拉漢數與安全邊際沿用 screener 的向量化核心，整體一次算完
+    graham_all, mos_all = _graham_mos_kernel(
+        universe_frame.eps,
+        universe_frame.bv,
+        universe_frame.price,
+        thresholds.graham_multiplier,
+        universe_frame.valid,
+    )
+    graham_values = graham_all.tolist()
+    mos_values = mos_all.tolist()
+    sector_indices = _sector_indices(valid_metrics)
+    # 建立結果時直接分流，不必事後再走訪兩次篩出通過/失敗
+    passed_results: list[SectorScreeningResult] = []
+    failed_results: list[SectorScreeningResult] = []
+
+    # 迴圈內不變的門檻先綁定為區域變數
+    pct_threshold = thresholds.sector_percentile_threshold
+    min_sector_size = thresholds.min_sector_size
+
+    for sector, idx in sector_indices.items():
+        positions = idx.tolist()
+        group = [valid_metrics[i] for i in positions]
+        safety_flags = universe_safety[idx].tolist()
+
+        # Track 1：產業百分位（整個產業一次判定）
+        if len(group) >= min_sector_size:
+            screening_mode = "dual_track"
+            rank_matrix = _sector_rank_matrix(universe_frame.take(idx))
+            sector_percentiles = _percentiles_from_ranks(group, rank_matrix)
+            sector_flags = _sector_pass_mask(rank_matrix, pct_threshold).tolist()
+        else:
+            # 產業太小，跳過百分位篩選（不計算排名），視為通過
+            screening_mode = "safety_only"
+            sector_count = len(group)
+            sector_percentiles = [
+                SectorPercentiles(sector=sector, sector_count=sector_count)
+                for _ in group
+            ]
+            sector_flags = [True] * sector_count
+
+        for i, metrics, percentiles, sector_passed, safety_passed in zip(
+            positions, group, sector_percentiles, sector_flags, safety_flags,
+        ):
+            # Track 2：安全底線（僅未通過者才記錄失敗原因代碼）
+            safety_codes: list[FailCode] = []
+            if not safety_passed:
+                safety_codes = _collect_safety_codes(metrics, thresholds)
 
             # 最終判定：兩個 track 都通過
             passed = safety_passed and sector_passed
 
-            # 收集失敗原因
-            fail_reasons: list[str] = []
-            if not sector_passed and use_sector_filter:
-                fail_reasons.append("未通過產業內百分位排名篩選")
-            if not safety_passed:
-                fail_reasons.extend(safety_reasons)
-
-            # 計算葛拉漢數
-            graham = None
-            mos_pct = None
-            if metrics.trailing_eps and metrics.book_value:
-                graham = calculate_graham_number(
-                    metrics.trailing_eps,
-                    metrics.book_value,
-                    thresholds.graham_multiplier,
-                )
-                if graham and metrics.current_price:
-                    mos_pct = (graham - metrics.current_price) / graham * 100
+            # 收集失敗原因（文字延後至讀取 fail_reasons 時才格式化）
+            fail_codes: list[FailCode] = []
+            if not sector_passed:
+                fail_codes.append(_SECTOR_PERCENTILE_FAIL)
+            fail_codes.extend(safety_codes)
 
-            results.append(
+            (passed_results if passed else failed_results).append(
                 SectorScreeningResult(
                     symbol=metrics.symbol,
                     passed=passed,
@@ -319,30 +387,28 @@ def screen_batch_dual_track(
                     sector_percentiles=percentiles,
                     passed_sector_filter=sector_passed,
                     passed_safety_filter=safety_passed,
-                    safety_fail_reasons=safety_reasons,
-                    graham_number=graham,
+                    safety_fail_codes=safety_codes,
+                    graham_number=_nan_to_none(graham_values[i]),
                     current_price=metrics.current_price,
-                    margin_of_safety_pct=mos_pct,
+                    margin_of_safety_pct=_nan_to_none(mos_values[i]),
                     metrics=metrics,
-                    fail_reasons=fail_reasons,
+                    fail_codes=fail_codes,
                 )
             )
 
     # 處理抓取失敗的股票
     for m in invalid_metrics:
-        results.append(
+        failed_results.append(
             SectorScreeningResult(
                 symbol=m.symbol,
                 passed=False,
                 screening_mode="error",
                 metrics=m,
-                fail_reasons=[f"資料抓取失敗: {m.fetch_error}"],
+                fail_codes=[("FETCH_ERROR", m.fetch_error, None)],
             )
         )
 
     # 排序：通過的按安全邊際降序排前面，失敗的排後面
-    passed = [r for r in results if r.passed]
-    failed = [r for r in results if not r.passed]
-    passed.sort(key=lambda r: r.margin_of_safety_pct or -999, reverse=True)
+    passed_results.sort(key=_mos_sort_key, reverse=True)
 
-    return passed + failed
+    return passed_results + failed_results
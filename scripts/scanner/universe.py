@@ -5,16 +5,19 @@
 合併為 S&P 1500，以及從本地 JSON 檔案載入自訂清單。
 """
 
-from io import StringIO
+from functools import lru_cache
 from pathlib import Path
+import heapq
 import json
 import logging
 
-import pandas as pd
+import lxml.html
 import requests
 
 logger = logging.getLogger(__name__)
 
+_encode_str = json.JSONEncoder(check_circular=False).encode
+
 _CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "data"
 
 # S&P 500 大型股
@@ -36,6 +39,53 @@ _WIKIPEDIA_SP600_URL = (
 )
 
 
+def _parse_symbol_column(html: str) -> list[str]:
+    """
+    從頁面第一個表格取出 Symbol 欄位。
+
+    直接以 lxml 走訪目標表格的列，不經 pd.read_html 解析頁面上所有表格
+    再建立 DataFrame。
+    """
+    tree = lxml.html.fromstring(html)
+    tables = tree.xpath("//table")
+    if not tables:
+        raise ValueError("頁面中找不到成分股表格")
+
+    rows = tables[0].xpath(".//tr")
+    if not rows:
+        raise ValueError("成分股表格沒有任何資料列")
+    header = [cell.text_content().strip() for cell in rows[0].xpath("./th|./td")]
+    if "Symbol" not in header:
+        raise ValueError(f"成分股表格缺少 Symbol 欄位: {header}")
+    col = header.index("Symbol")
+
+    symbols = []
+    for row in rows[1:]:
+        cells = row.xpath("./th|./td")
+        if len(cells) > col:
+            symbol = cells[col].text_content().strip()
+            if symbol:
+                symbols.append(symbol)
+    return symbols
+
+
+def _dump_ticker_list(tickers: list[str]) -> str:
+    """
+    序列化股票代碼清單，輸出與 json.dump(tickers, indent=2) 相同。
+
+    indent 參數會讓標準庫改走純 Python 編碼器，這裡逐項以 C 編碼器
+    編碼字串後自行排版。
+    """
+    if not tickers:
+        return "[]"
+    return "[\n  " + ",\n  ".join(map(_encode_str, tickers)) + "\n]"
+
+
+def _etag_path(cache_path: Path) -> Path:
+    """快取檔對應的 ETag 檔（與清單 JSON 分開存放，清單格式不變）。"""
+    return cache_path.with_suffix(".etag")
+
+
 def _fetch_wikipedia_tickers(
     url: str,
     cache_path: Path,
@@ -47,6 +97,9 @@ def _fetch_wikipedia_tickers(
 
     透過 requests（內建 certifi）避免 macOS SSL 憑證問題，
     結果快取至指定的 JSON 檔案。
+
+    強制更新時若已有快取與 ETag，改發條件式請求（If-None-Match）；
+    頁面未變動（304）則沿用快取，省去下載整頁 HTML 與解析。
     """
     if use_cache and cache_path.exists():
         logger.info("從快取載入 %s 清單: %s", label, cache_path)
@@ -56,42 +109,89 @@ def _fetch_wikipedia_tickers(
     logger.info("從 Wikipedia 抓取 %s 清單...", label)
     # Wikipedia 會封鎖預設 User-Agent，需設定合理的標頭
     headers = {"User-Agent": "QuantAnalystAgent/1.0 (financial screening tool)"}
+    etag_path = _etag_path(cache_path)
+    if cache_path.exists() and etag_path.exists():
+        headers["If-None-Match"] = etag_path.read_text().strip()
+
     response = requests.get(url, headers=headers, timeout=30)
+    if response.status_code == 304:
+        logger.info("%s 清單未變動，沿用快取: %s", label, cache_path)
+        with open(cache_path) as f:
+            return json.load(f)
     response.raise_for_status()
 
-    tables = pd.read_html(StringIO(response.text))
-    df = tables[0]
-    tickers = sorted(df["Symbol"].tolist())
+    tickers = sorted(_parse_symbol_column(response.text))
     # 正規化：BRK.B -> BRK-B（yfinance 格式）
     tickers = [t.replace(".", "-") for t in tickers]
 
     cache_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(cache_path, "w") as f:
-        json.dump(tickers, f, indent=2)
+    cache_path.write_text(_dump_ticker_list(tickers))
+    etag = response.headers.get("ETag")
+    if etag:
+        etag_path.write_text(etag)
+    else:
+        etag_path.unlink(missing_ok=True)
     logger.info("已快取 %d 支股票至 %s", len(tickers), cache_path)
 
     return tickers
 
 
+@lru_cache(maxsize=16)
+def _memoized_tickers(
+    url: str,
+    cache_path: Path,
+    label: str,
+    mtime_ns: int | None,
+) -> tuple[str, ...]:
+    """
+    行程內記憶化：同一清單只讀取一次檔案快取（或抓取一次 Wikipedia）。
+
+    mtime_ns 為快取檔的修改時間，只作為快取鍵：其他行程或強制更新重寫
+    檔案後鍵值改變，長時間執行的行程（如 MCP server）會重新讀取。
+    """
+    return tuple(_fetch_wikipedia_tickers(url, cache_path, label, use_cache=True))
+
+
+def _get_tickers(
+    url: str,
+    cache_path: Path,
+    label: str,
+    use_cache: bool,
+) -> list[str]:
+    """
+    依序查詢行程內記憶體 → JSON 檔案快取 → Wikipedia。
+
+    Layer 3 會為每支股票的同業比較重複取得清單，記憶化後只需讀取一次。
+    記憶體內的清單以快取檔 mtime 為鍵，檔案更新後自動失效。
+    use_cache=False 時強制重新抓取。回傳新的 list，呼叫端可自由修改。
+    """
+    if not use_cache:
+        return _fetch_wikipedia_tickers(url, cache_path, label, use_cache=False)
+    try:
+        mtime_ns = cache_path.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    return list(_memoized_tickers(url, cache_path, label, mtime_ns))
+
+
 def get_sp500_tickers(use_cache: bool = True) -> list[str]:
     """取得 S&P 500 大型股成分股代碼。"""
-    return _fetch_wikipedia_tickers(
-        _WIKIPEDIA_SP500_URL, _SP500_CACHE, "S&P 500", use_cache
-    )
+    return _get_tickers(_WIKIPEDIA_SP500_URL, _SP500_CACHE, "S&P 500", use_cache)
 
 
 def get_sp400_tickers(use_cache: bool = True) -> list[str]:
     """取得 S&P MidCap 400 中型股成分股代碼。"""
-    return _fetch_wikipedia_tickers(
-        _WIKIPEDIA_SP400_URL, _SP400_CACHE, "S&P 400", use_cache
-    )
+    return _get_tickers(_WIKIPEDIA_SP400_URL, _SP400_CACHE, "S&P 400", use_cache)
 
 
 def get_sp600_tickers(use_cache: bool = True) -> list[str]:
     """取得 S&P SmallCap 600 小型股成分股代碼。"""
-    return _fetch_wikipedia_tickers(
-        _WIKIPEDIA_SP600_URL, _SP600_CACHE, "S&P 600", use_cache
-    )
+    return _get_tickers(_WIKIPEDIA_SP600_URL, _SP600_CACHE, "S&P 600", use_cache)
+
+
+def _is_sorted(tickers: list[str]) -> bool:
+    """檢查清單是否已依字典序排序。"""
+    return all(a <= b for a, b in zip(tickers, tickers[1:]))
 
 
 def get_sp1500_tickers(use_cache: bool = True) -> list[str]:
@@ -99,13 +199,22 @@ def get_sp1500_tickers(use_cache: bool = True) -> list[str]:
     取得 S&P 1500 成分股代碼（S&P 500 + 400 + 600 聯集，去重複）。
 
     不另外快取——由三個子清單各自快取後合併。
+    子清單由抓取時排序，通常可直接以 heapq.merge 一次合併並去除相鄰的
+    重複代碼；若有子清單未排序（如手動編輯過的快取）則退回排序去重。
     """
-    all_tickers = (
-        get_sp500_tickers(use_cache)
-        + get_sp400_tickers(use_cache)
-        + get_sp600_tickers(use_cache)
-    )
-    return sorted(set(all_tickers))
+    sub_lists = [
+        get_sp500_tickers(use_cache),
+        get_sp400_tickers(use_cache),
+        get_sp600_tickers(use_cache),
+    ]
+    if not all(_is_sorted(tickers) for tickers in sub_lists):
+        return sorted(set().union(*sub_lists))
+
+    merged: list[str] = []
+    for ticker in heapq.merge(*sub_lists):
+        if not merged or merged[-1] != ticker:
+            merged.append(ticker)
+    return merged
 
 
 def get_tickers_from_file(filepath: str | Path) -> list[str]:
@@ -4,7 +4,8 @@
 測試數據結構序列化、yfinance API 整合、數據品質分數計算。
 """
 
-from unittest.mock import patch, MagicMock, PropertyMock
+from types import SimpleNamespace
+from unittest.mock import patch
 import math
 
 import pandas as pd
@@ -27,6 +28,7 @@ from scripts.analyzer.deep_data_fetcher import (
     _extract_growth_momentum,
     _extract_risk_metrics,
     fetch_deep_data,
+    fetch_batch_deep_data,
 )
 
 
@@ -282,6 +284,20 @@ class TestDeepAnalysisDataSerialization:
         assert d.valuation.ev_to_ebitda is None
         assert d.financial_health.revenue_history == {}
 
+    def test_from_dict_interns_repeated_strings(self):
+        """產業、行業、幣別反序列化後共用同一字串物件。"""
+        a = DeepAnalysisData.from_dict({
+            "symbol": "A", "sector": "".join(["Tech", "nology"]),
+            "industry": "".join(["Soft", "ware"]), "currency": "".join(["U", "SD"]),
+        })
+        b = DeepAnalysisData.from_dict({
+            "symbol": "B", "sector": "".join(["Techno", "logy"]),
+            "industry": "".join(["Softw", "are"]), "currency": "".join(["US", "D"]),
+        })
+        assert a.sector is b.sector
+        assert a.industry is b.industry
+        assert a.currency is b.currency
+
     def test_json_compatible(self):
         """to_dict() 的結果應可被 json.dumps 處理。"""
         import json
@@ -354,6 +370,13 @@ class TestSafeFloat:
     def test_numeric_string(self):
         assert _safe_float("3.14") == 3.14
 
+    def test_numpy_scalars(self):
+        """numpy 純量走一般轉換路徑，NaN 仍應過濾。"""
+        import numpy as np
+        assert _safe_float(np.int64(7)) == 7.0
+        assert _safe_float(np.float64(1.5)) == 1.5
+        assert _safe_float(np.float64("nan")) is None
+
 
 class TestDfRowToHistory:
     """_df_row_to_history DataFrame → dict 轉換測試。"""
@@ -371,6 +394,27 @@ class TestDfRowToHistory:
         result = _df_row_to_history(df, "Total Revenue")
         assert result == {"2024": 100e9, "2023": 90e9, "2022": 80e9}
 
+    def test_year_keys_shared_across_rows(self):
+        """不同行產生的年份 key 共用同一字串物件。"""
+        df = pd.DataFrame(
+            {"Revenue": [100e9], "Net Income": [20e9]},
+            index=[pd.Timestamp("2024-12-31")],
+        ).T
+        (rev_key,) = _df_row_to_history(df, "Revenue")
+        (ni_key,) = _df_row_to_history(df, "Net Income")
+        assert rev_key == "2024"
+        assert rev_key is ni_key
+
+    def test_nat_column(self):
+        """欄位含 NaT 時其他年份 key 仍為 '2024'，不拋錯。"""
+        df = pd.DataFrame(
+            {"Total Revenue": [100e9, 90e9]},
+            index=pd.DatetimeIndex([pd.Timestamp("2024-12-31"), pd.NaT]),
+        ).T
+        result = _df_row_to_history(df, "Total Revenue")
+        assert result["2024"] == 100e9
+        assert "2024.0" not in result
+
     def test_missing_row(self):
         """不存在的行名應回傳空 dict。"""
         df = pd.DataFrame({"A": [1]}).T
@@ -393,6 +437,20 @@ class TestDfRowToHistory:
         result = _df_row_to_history(df, "Revenue")
         assert result == {"2024": 100e9}
 
+    def test_object_row_with_none_and_inf(self):
+        """object 欄位中的 None、inf 與無法轉換的字串都應被過濾。"""
+        df = pd.DataFrame(
+            [[None, float("inf"), 5], ["n/a", 7.5, 1]],
+            index=["Revenue", "Other"],
+            columns=[
+                pd.Timestamp("2024-12-31"),
+                pd.Timestamp("2023-12-31"),
+                pd.Timestamp("2022-12-31"),
+            ],
+        )
+        assert _df_row_to_history(df, "Revenue") == {"2022": 5.0}
+        assert _df_row_to_history(df, "Other") == {"2023": 7.5, "2022": 1.0}
+
 
 class TestDfToRecords:
     """_df_to_records DataFrame → list[dict] 轉換測試。"""
@@ -539,7 +597,7 @@ class TestExtractGrowthMomentum:
 
     @patch("scripts.analyzer.deep_data_fetcher.yf.Ticker")
     def test_full_extraction(self, mock_ticker_cls):
-        mock_ticker = MagicMock()
+        mock_ticker = SimpleNamespace()
         mock_ticker_cls.return_value = mock_ticker
 
         # 模擬 earnings_estimate
@@ -581,7 +639,7 @@ class TestExtractRiskMetrics:
 
     @patch("scripts.analyzer.deep_data_fetcher.yf.Ticker")
     def test_full_extraction(self, mock_ticker_cls):
-        mock_ticker = MagicMock()
+        mock_ticker = SimpleNamespace()
         mock_ticker_cls.return_value = mock_ticker
 
         # 模擬 insider_transactions（近期交易）
@@ -630,7 +688,7 @@ class TestFetchDeepData:
     @patch("scripts.analyzer.deep_data_fetcher.yf.Ticker")
     def test_basic_fetch(self, mock_ticker_cls):
         """基本抓取應正確填充所有欄位。"""
-        mock_ticker = MagicMock()
+        mock_ticker = SimpleNamespace()
         mock_ticker_cls.return_value = mock_ticker
 
         mock_ticker.info = {
@@ -708,7 +766,7 @@ class TestFetchDeepData:
     @patch("scripts.analyzer.deep_data_fetcher.yf.Ticker")
     def test_no_data_returns_empty(self, mock_ticker_cls):
         """無數據應回傳空的 DeepAnalysisData。"""
-        mock_ticker = MagicMock()
+        mock_ticker = SimpleNamespace()
         mock_ticker_cls.return_value = mock_ticker
         mock_ticker.info = {}
 
@@ -717,11 +775,25 @@ class TestFetchDeepData:
         assert result.company_name == ""
         assert result.data_quality_score == 0.0
 
+    @patch("scripts.analyzer.price_chart.fetch_price_history")
+    @patch("scripts.analyzer.deep_data_fetcher.yf.Ticker")
+    def test_prefetched_price_history_used(self, mock_ticker_cls, mock_history):
+        """提供預抓的價格歷史時不再逐支抓取。"""
+        mock_ticker_cls.return_value = SimpleNamespace(
+            info={"quoteType": "EQUITY", "shortName": "Pre Corp"},
+        )
+        prices = {"dates": ["2026-01-02"], "closes": [10.0]}
+
+        result = fetch_deep_data("PRE", price_history=prices)
+
+        assert result.price_history == prices
+        mock_history.assert_not_called()
+
     @patch("scripts.analyzer.deep_data_fetcher.yf.Ticker")
     def test_json_serializable(self, mock_ticker_cls):
         """fetch_deep_data 結果應可 JSON 序列化。"""
         import json
-        mock_ticker = MagicMock()
+        mock_ticker = SimpleNamespace()
         mock_ticker_cls.return_value = mock_ticker
         mock_ticker.info = {
             "quoteType": "EQUITY",
@@ -748,6 +820,66 @@ class TestFetchDeepData:
         assert restored.symbol == "SER"
 
 
+class TestFetchBatchDeepData:
+    """fetch_batch_deep_data 並行批次抓取測試。"""
+
+    @patch("scripts.analyzer.price_chart.fetch_price_history_batch", return_value={})
+    @patch("scripts.analyzer.deep_data_fetcher.fetch_deep_data")
+    def test_parallel_preserves_order(self, mock_fetch, _mock_prices):
+        """並行抓取的結果順序應與輸入相同，進度回報到總數。"""
+        mock_fetch.side_effect = lambda s, **_: _make_deep_analysis(symbol=s)
+        progress = []
+
+        results = fetch_batch_deep_data(
+            ["A", "B", "C", "D"],
+            delay_between=0,
+            max_workers=4,
+            progress_callback=lambda cur, total: progress.append((cur, total)),
+        )
+
+        assert [r.symbol for r in results] == ["A", "B", "C", "D"]
+        assert progress[-1] == (4, 4)
+
+    @patch("scripts.analyzer.price_chart.fetch_price_history_batch")
+    @patch("scripts.analyzer.deep_data_fetcher.fetch_deep_data")
+    def test_prefetched_prices_passed_through(self, mock_fetch, mock_prices):
+        """價格歷史批次預抓一次（共用節流器），並傳給各支 fetch_deep_data。"""
+        mock_fetch.side_effect = lambda s, **_: _make_deep_analysis(symbol=s)
+        prices = {"dates": ["2026-01-02"], "closes": [10.0]}
+        mock_prices.return_value = {"A": prices}
+
+        fetch_batch_deep_data(["A", "B"], delay_between=0, max_workers=1)
+
+        mock_prices.assert_called_once()
+        assert mock_prices.call_args[0] == (["A", "B"],)
+        assert mock_prices.call_args[1]["limiter"] is not None
+        assert mock_fetch.call_args_list[0][1] == {"price_history": prices}
+        assert mock_fetch.call_args_list[1][1] == {"price_history": None}
+
+    @patch("scripts.analyzer.price_chart.fetch_price_history_batch", return_value={})
+    @patch("scripts.analyzer.deep_data_fetcher.fetch_deep_data")
+    def test_interrupt_cancels_pending(self, mock_fetch, _mock_prices):
+        """主執行緒中斷時取消佇列中的抓取，不會把剩餘清單全部抓完。"""
+        mock_fetch.side_effect = lambda s, **_: _make_deep_analysis(symbol=s)
+
+        def _interrupt(cur, total):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            fetch_batch_deep_data(
+                [f"T{i}" for i in range(30)],
+                delay_between=0.01,
+                progress_callback=_interrupt,
+                max_workers=1,
+            )
+
+        assert mock_fetch.call_count < 30
+
+    def test_empty_symbols(self):
+        """空清單不發出任何請求。"""
+        assert fetch_batch_deep_data([]) == []
+
+
 # ============================================================
 # Task 5 測試：DeepDataCache 快取
 # ============================================================
@@ -792,6 +924,116 @@ class TestDeepDataCache:
         assert cached is not None
         assert cached.symbol == "MSFT"
 
+    def test_save_writes_one_symbol_per_line(self, tmp_path):
+        """存檔為合法 JSON，每個 symbol 一行，中文不跳脫。"""
+        import json
+        cache = DeepDataCache(cache_dir=tmp_path)
+        cache.put(_make_deep_analysis(symbol="AAPL"))
+        data = _make_deep_analysis(symbol="MSFT")
+        data.ai_summary_text = "穩健成長"
+        cache.put(data)
+        cache.save()
+
+        text = (tmp_path / "deep_analysis_cache.json").read_text(encoding="utf-8")
+        lines = text.splitlines()
+        assert len(lines) == 4
+        assert lines[1].startswith('"AAPL": ')
+        assert lines[2].startswith('"MSFT": ')
+        assert "穩健成長" in text
+        assert set(json.loads(text)) == {"AAPL", "MSFT"}
+
+    def test_save_appends_changed_symbols_to_log(self, tmp_path):
+        """已有快照時，單筆 put 只追加至日誌，load 時合併回來。"""
+        cache1 = DeepDataCache(cache_dir=tmp_path)
+        for symbol in ("AAPL", "MSFT", "GOOG", "AMZN"):
+            cache1.put(_make_deep_analysis(symbol=symbol))
+        cache1.save()
+        snapshot = (tmp_path / "deep_analysis_cache.json").read_text(encoding="utf-8")
+
+        cache1.put(_make_deep_analysis(symbol="NVDA"))
+        cache1.save()
+
+        # 快照未重寫，變更寫在日誌
+        assert (tmp_path / "deep_analysis_cache.json").read_text(encoding="utf-8") == snapshot
+        assert len((tmp_path / "deep_analysis_cache.log").read_text().splitlines()) == 1
+
+        cache2 = DeepDataCache(cache_dir=tmp_path)
+        cache2.load()
+        assert cache2.size == 5
+        assert cache2.get("NVDA") is not None
+
+    def test_log_compacted_into_snapshot(self, tmp_path):
+        """日誌累積超過快照一半時合併重寫快照並刪除日誌。"""
+        cache = DeepDataCache(cache_dir=tmp_path)
+        for symbol in ("AAPL", "MSFT", "GOOG", "AMZN"):
+            cache.put(_make_deep_analysis(symbol=symbol))
+        cache.save()
+
+        for symbol in ("NVDA", "META", "TSLA"):
+            cache.put(_make_deep_analysis(symbol=symbol))
+            cache.save()
+
+        assert not (tmp_path / "deep_analysis_cache.log").exists()
+        reloaded = DeepDataCache(cache_dir=tmp_path)
+        reloaded.load()
+        assert reloaded.size == 7
+
+    def test_truncated_log_line_ignored(self, tmp_path):
+        """日誌尾端的半行（寫入中斷）應被忽略。"""
+        cache = DeepDataCache(cache_dir=tmp_path)
+        for symbol in ("AAPL", "MSFT", "GOOG", "AMZN"):
+            cache.put(_make_deep_analysis(symbol=symbol))
+        cache.save()
+        cache.put(_make_deep_analysis(symbol="NVDA"))
+        cache.save()
+        with open(tmp_path / "deep_analysis_cache.log", "a") as f:
+            f.write('["META", {"fetch')
+
+        reloaded = DeepDataCache(cache_dir=tmp_path)
+        reloaded.load()
+        assert reloaded.size == 5
+        assert reloaded.get("META") is None
+
+    def test_corrupt_snapshot_still_replays_log(self, tmp_path):
+        """快照損壞時仍重播日誌，下次存檔把日誌內容寫回快照。"""
+        cache = DeepDataCache(cache_dir=tmp_path)
+        for symbol in ("AAPL", "MSFT", "GOOG", "AMZN"):
+            cache.put(_make_deep_analysis(symbol=symbol))
+        cache.save()
+        cache.put(_make_deep_analysis(symbol="NVDA"))
+        cache.save()
+        (tmp_path / "deep_analysis_cache.json").write_text("{broken")
+
+        reloaded = DeepDataCache(cache_dir=tmp_path)
+        reloaded.load()
+        assert reloaded.get("NVDA") is not None
+        reloaded.save()
+
+        final = DeepDataCache(cache_dir=tmp_path)
+        final.load()
+        assert final.get("NVDA") is not None
+        assert not (tmp_path / "deep_analysis_cache.log").exists()
+
+    def test_snapshot_crash_does_not_leave_stale_log(self, tmp_path):
+        """合併快照時在替換前中斷，舊日誌不會留下來覆蓋之後的資料。"""
+        cache = DeepDataCache(cache_dir=tmp_path)
+        for symbol in ("AAPL", "MSFT", "GOOG", "AMZN"):
+            cache.put(_make_deep_analysis(symbol=symbol))
+        cache.save()
+        cache.put(_make_deep_analysis(symbol="NVDA"))
+        cache.save()
+        assert (tmp_path / "deep_analysis_cache.log").exists()
+
+        cache.clear()
+        with patch(
+            "scripts.analyzer.deep_data_fetcher.os.replace",
+            side_effect=OSError("crash"),
+        ):
+            with pytest.raises(OSError):
+                cache.save()
+
+        assert not (tmp_path / "deep_analysis_cache.log").exists()
+
     def test_ttl_expiry(self, tmp_path):
         """過期的數據應回傳 None。"""
         from scripts.scanner.config import CacheConfig
@@ -86,6 +86,17 @@ class TestRankAmongPeers:
         ranks = rank_among_peers(target, peers)
         assert "pe" not in ranks
 
+    def test_tie_ranks_target_first(self):
+        """同值時目標股排在同業之前。"""
+        target = {"symbol": "TARGET", "pe": 10.0, "roe": 0.20}
+        peers = [
+            {"symbol": "A", "pe": 10.0, "roe": 0.20},
+            {"symbol": "B", "pe": 8.0, "roe": 0.30},
+        ]
+        ranks = rank_among_peers(target, peers)
+        assert ranks["pe"] == 2
+        assert ranks["roe"] == 2
+
     def test_multiple_metrics(self):
         """多指標同時排名。"""
         target = {
@@ -145,6 +156,39 @@ class TestFetchPeerMetrics:
         assert len(result) == 1
         assert result[0]["symbol"] == "FAIL"
         assert result[0]["pe"] is None
+        # 鍵集合應與成功抓取時一致，其餘指標皆為 None
+        assert result[0]["debt_to_equity"] is None
+        assert "market_cap" in result[0]
+
+    @patch("scripts.analyzer.peer_finder.yf.Ticker")
+    def test_parallel_preserves_order(self, mock_ticker_cls):
+        """並行抓取的結果順序應與輸入相同，單支失敗不影響其他。"""
+        def _make_ticker(symbol):
+            if symbol == "BAD":
+                raise Exception("API error")
+            ticker = MagicMock()
+            ticker.info = {"shortName": symbol, "trailingPE": float(len(symbol))}
+            return ticker
+
+        mock_ticker_cls.side_effect = _make_ticker
+
+        symbols = ["A", "BB", "BAD", "CCCC", "DDDDD"]
+        result = fetch_peer_metrics(symbols, max_workers=3, delay_between=0)
+        assert [r["symbol"] for r in result] == symbols
+        assert result[1]["pe"] == 2.0
+        assert result[2]["pe"] is None
+        assert result[4]["name"] == "DDDDD"
+
+    @patch("scripts.analyzer.peer_finder.RateLimiter")
+    @patch("scripts.analyzer.peer_finder.yf.Ticker")
+    def test_each_peer_throttled(self, mock_ticker_cls, mock_limiter_cls):
+        """每支同業抓取前都經過共用節流器。"""
+        mock_ticker_cls.return_value.info = {"shortName": "Peer"}
+
+        fetch_peer_metrics(["A", "B", "C"], max_workers=3, delay_between=0.2)
+
+        mock_limiter_cls.assert_called_once_with(0.2)
+        assert mock_limiter_cls.return_value.wait.call_count == 3
 
 
 # ============================================================
@@ -290,6 +334,26 @@ class TestFindPeers:
         assert "ACN" not in result
         assert "ADBE" not in result
 
+    @patch("scripts.analyzer.peer_finder.fetch_batch_metrics")
+    def test_industry_peers_top_of_sector(self, mock_batch):
+        """同 industry 也是同 sector 市值最大者時，仍應補滿 count 支。"""
+        metrics = [
+            _make_metrics("IND1", industry="Software", market_cap=900e9),
+            _make_metrics("IND2", industry="Software", market_cap=800e9),
+        ] + [
+            _make_metrics(f"SEC{i}", industry="Hardware", market_cap=(100 - i) * 1e9)
+            for i in range(1, 21)
+        ]
+        mock_batch.return_value = metrics
+
+        with patch(
+            "scripts.scanner.universe.get_sp500_tickers",
+            return_value=[m.symbol for m in metrics] + ["TARGET"],
+        ):
+            result = find_peers("TARGET", "Technology", "Software", count=5)
+
+        assert result == ["IND1", "IND2", "SEC1", "SEC2", "SEC3"]
+
     @patch("scripts.analyzer.peer_finder.fetch_batch_metrics")
     def test_industry_priority_preserved(self, mock_batch):
         """混合時同 industry 應排在前面，即使市值較小。"""
@@ -12,6 +12,7 @@ import pytest
 
 from scripts.analyzer.price_chart import (
     fetch_price_history,
+    fetch_price_history_batch,
     generate_price_chart,
 )
 
@@ -65,6 +66,61 @@ class TestFetchPriceHistory:
         assert result == {}
 
 
+class TestFetchPriceHistoryBatch:
+    """fetch_price_history_batch 批次抓取測試。"""
+
+    @patch("scripts.analyzer.price_chart.yf")
+    def test_batch_fetch(self, mock_yf):
+        """多股下載應依代碼拆分，各自去除 NaN，缺少的代碼不出現。"""
+        import numpy as np
+        import pandas as pd
+
+        dates = pd.to_datetime(["2026-01-01", "2026-01-02", "2026-01-03"])
+        columns = pd.MultiIndex.from_product([["AAPL", "MSFT"], ["Open", "Close"]])
+        mock_yf.download.return_value = pd.DataFrame(
+            [
+                [99.0, 100.0, 399.0, np.nan],
+                [100.0, 102.456, 400.0, 401.0],
+                [101.0, 101.0, 402.0, 403.0],
+            ],
+            index=dates,
+            columns=columns,
+        )
+
+        result = fetch_price_history_batch(["AAPL", "MSFT", "GONE"])
+
+        assert set(result) == {"AAPL", "MSFT"}
+        assert result["AAPL"]["closes"] == [100.0, 102.46, 101.0]
+        assert result["AAPL"]["dates"] == ["2026-01-01", "2026-01-02", "2026-01-03"]
+        assert result["MSFT"]["dates"] == ["2026-01-02", "2026-01-03"]
+        assert mock_yf.download.call_count == 1
+
+    @patch("scripts.analyzer.price_chart.yf")
+    def test_chunks_share_limiter(self, mock_yf):
+        """代碼分塊下載，每塊下載前佔用節流器一個時間槽。"""
+        mock_yf.download.return_value = None
+        limiter = MagicMock()
+
+        fetch_price_history_batch(
+            ["A", "B", "C", "D", "E"], limiter=limiter, chunk_size=2,
+        )
+
+        assert mock_yf.download.call_count == 3
+        assert limiter.wait.call_count == 3
+        chunks = [c[1]["tickers"] for c in mock_yf.download.call_args_list]
+        assert chunks == [["A", "B"], ["C", "D"], ["E"]]
+
+    @patch("scripts.analyzer.price_chart.yf")
+    def test_download_error_returns_empty_dict(self, mock_yf):
+        """批次下載失敗應回傳空 dict，交由呼叫端逐支補抓。"""
+        mock_yf.download.side_effect = Exception("網路錯誤")
+        assert fetch_price_history_batch(["AAPL"]) == {}
+
+    def test_empty_symbols(self):
+        """空清單不應發出請求。"""
+        assert fetch_price_history_batch([]) == {}
+
+
 # ============================================================
 # generate_price_chart 測試
 # ============================================================
@@ -141,6 +197,68 @@ class TestGeneratePriceChart:
             assert charts_dir.exists()
             assert charts_dir.is_dir()
 
+    def test_existing_chart_reused(self):
+        """當日圖表比數據抓取時間新時應直接回傳路徑，不重新繪製。"""
+        price_history = {
+            "dates": ["2026-01-01", "2026-01-02"],
+            "closes": [100.0, 105.0],
+        }
+        fetched_at = "2026-01-02T00:00:00+00:00"
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            first = generate_price_chart(
+                symbol="TEST",
+                company_name="Test Corp",
+                price_history=price_history,
+                output_dir=Path(tmpdir),
+                fetched_at=fetched_at,
+            )
+
+            with patch(
+                "scripts.analyzer.price_chart._configure_matplotlib",
+            ) as mock_configure:
+                second = generate_price_chart(
+                    symbol="TEST",
+                    company_name="Test Corp",
+                    price_history=price_history,
+                    output_dir=Path(tmpdir),
+                    fetched_at=fetched_at,
+                )
+
+            assert second == first
+            mock_configure.assert_not_called()
+
+    def test_stale_chart_redrawn(self):
+        """數據在圖表繪製後重新抓取（例如 --force-refresh）時應重繪。"""
+        from datetime import datetime, timedelta, timezone
+
+        price_history = {
+            "dates": ["2026-01-01", "2026-01-02"],
+            "closes": [100.0, 105.0],
+        }
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            generate_price_chart(
+                symbol="TEST",
+                company_name="Test Corp",
+                price_history=price_history,
+                output_dir=Path(tmpdir),
+            )
+
+            refetched_at = (datetime.now(timezone.utc) + timedelta(minutes=1)).isoformat()
+            with patch(
+                "scripts.analyzer.price_chart._configure_matplotlib",
+            ) as mock_configure:
+                generate_price_chart(
+                    symbol="TEST",
+                    company_name="Test Corp",
+                    price_history=price_history,
+                    output_dir=Path(tmpdir),
+                    fetched_at=refetched_at,
+                )
+
+            mock_configure.assert_called_once()
+
     def test_empty_dates_returns_none(self):
         """空日期列表應回傳 None。"""
         result = generate_price_chart(
@@ -174,9 +174,10 @@ class TestMainArgParsing:
         mock_load.assert_called_once()
         assert mock_analyze.call_count == 2  # MSFT + DELL
 
+    @patch("scripts.analyzer.run_layer3.fetch_batch_deep_data", return_value=[])
     @patch("scripts.analyzer.run_layer3._analyze_single")
     @patch("scripts.analyzer.run_layer3._cache")
-    def test_force_refresh_disables_cache(self, mock_cache, mock_analyze):
+    def test_force_refresh_disables_cache(self, mock_cache, mock_analyze, _mock_batch):
         """--force-refresh 應停用快取。"""
         mock_analyze.return_value = None
 
@@ -269,3 +270,20 @@ class TestMainArgParsing:
         call_kwargs = mock_analyze.call_args[1]
         assert call_kwargs["ai_summary"] is True
         assert call_kwargs["include_chart"] is True
+
+    @patch("scripts.analyzer.run_layer3.fetch_batch_deep_data")
+    @patch("scripts.analyzer.run_layer3._analyze_single")
+    @patch("scripts.analyzer.run_layer3._cache")
+    def test_cache_misses_batch_fetched(self, mock_cache, mock_analyze, mock_batch):
+        """快取未命中者一次批次抓取，結果傳給 _analyze_single；命中者不預抓。"""
+        mock_analyze.return_value = None
+        mock_cache.get.side_effect = lambda s: MagicMock() if s == "HIT" else None
+        miss_data = MagicMock()
+        mock_batch.return_value = [miss_data]
+
+        with patch("sys.argv", ["run_layer3", "--tickers", "HIT", "MISS"]):
+            main()
+
+        mock_batch.assert_called_once_with(["MISS"])
+        passed = {c[1]["symbol"]: c[1]["deep_data"] for c in mock_analyze.call_args_list}
+        assert passed == {"HIT": None, "MISS": miss_data}
@@ -1,11 +1,15 @@
 """Tests for the data fetcher module."""
 
+import math
 from unittest.mock import patch, MagicMock
 
+import numpy as np
 import pytest
 
 from scripts.scanner.data_fetcher import (
+    fetch_batch_metrics,
     fetch_ticker_metrics,
+    MetricsFrame,
     TickerMetrics,
 )
 
@@ -145,3 +149,131 @@ def test_ticker_metrics_from_dict_missing_fields():
     assert restored.trailing_pe == 12.0
     assert restored.roe is None
     assert restored.fetch_error is None
+
+
+def test_metrics_frame_from_metrics():
+    """MetricsFrame 將 None 轉為 NaN，valid 對應 is_valid。"""
+    frame = MetricsFrame.from_metrics([
+        TickerMetrics(symbol="A", trailing_pe=10.0, trailing_eps=2.0, current_price=50.0),
+        TickerMetrics(symbol="B", fetch_error="timeout"),
+    ])
+
+    assert len(frame) == 2
+    assert frame.symbols == ["A", "B"]
+    assert frame.pe[0] == 10.0
+    assert math.isnan(frame.pe[1])
+    assert math.isnan(frame.roe[0])
+    assert frame.price[0] == 50.0
+    assert frame.valid.tolist() == [True, False]
+
+    empty = MetricsFrame.from_metrics([])
+    assert len(empty) == 0
+    assert empty.pe.shape == (0,)
+
+
+def test_metrics_frame_take():
+    """take 依索引取出子集，欄位與 symbols 同步。"""
+    frame = MetricsFrame.from_metrics([
+        TickerMetrics(symbol="A", trailing_pe=10.0),
+        TickerMetrics(symbol="B", trailing_pe=20.0),
+        TickerMetrics(symbol="C", trailing_pe=30.0),
+    ])
+
+    sub = frame.take(np.array([2, 0]))
+
+    assert sub.symbols == ["C", "A"]
+    assert sub.pe.tolist() == [30.0, 10.0]
+    assert sub.valid.tolist() == frame.valid[[2, 0]].tolist()
+
+
+# === 批次並行抓取測試 ===
+
+
+@patch("scripts.scanner.data_fetcher.yf.Ticker")
+def test_batch_fetch_parallel_preserves_order(mock_ticker_cls):
+    """並行抓取時結果仍依輸入順序排列，進度回報到 total。"""
+    def _make_ticker(symbol):
+        ticker = MagicMock()
+        ticker.info = _mock_info(shortName=f"{symbol} Corp")
+        return ticker
+
+    mock_ticker_cls.side_effect = _make_ticker
+    symbols = [f"T{i}" for i in range(10)]
+    progress = []
+
+    results = fetch_batch_metrics(
+        symbols,
+        delay_between=0,
+        progress_callback=lambda cur, total: progress.append((cur, total)),
+        use_cache=False,
+        max_workers=4,
+    )
+
+    assert [r.symbol for r in results] == symbols
+    assert [r.company_name for r in results] == [f"{s} Corp" for s in symbols]
+    assert len(progress) == len(symbols)
+    assert progress[-1] == (10, 10)
+
+
+@patch("scripts.scanner.metrics_cache.MetricsCache.save")
+@patch("scripts.scanner.metrics_cache.MetricsCache.load")
+@patch("scripts.scanner.data_fetcher.yf.Ticker")
+def test_batch_fetch_checkpoints_cache(mock_ticker_cls, mock_load, mock_save):
+    """每抓取 batch_size 筆即存檔一次，結束時再存檔一次。"""
+    mock_ticker_cls.return_value.info = _mock_info()
+
+    fetch_batch_metrics(
+        [f"T{i}" for i in range(7)],
+        delay_between=0,
+        use_cache=True,
+        max_workers=2,
+        batch_size=3,
+    )
+
+    # 第 3、6 筆各一次檢查點 + 結束時一次
+    assert mock_save.call_count == 3
+
+
+def test_from_dict_interns_sector():
+    """相同產業名稱反序列化後共用同一字串物件。"""
+    a = TickerMetrics.from_dict({"symbol": "A", "sector": "".join(["Tech", "nology"])})
+    b = TickerMetrics.from_dict({"symbol": "B", "sector": "".join(["Techno", "logy"])})
+    assert a.sector is b.sector
+
+
+def test_from_dict_non_str_sector_not_interned():
+    """yfinance 偶爾回傳 float nan 作為產業，不應因 intern 拋 TypeError。"""
+    m = TickerMetrics.from_dict({"symbol": "A", "sector": float("nan")})
+    assert m.sector != m.sector  # nan 原樣保留
+
+
+def test_to_summary_dict_fields():
+    """篩選結果內嵌的指標摘要只含前端使用的欄位，順序固定。"""
+    m = TickerMetrics(symbol="A", trailing_pe=10.0, sector="Tech", market_cap=1e9)
+    summary = m.to_summary_dict()
+    assert list(summary) == [
+        "trailing_pe", "peg_ratio", "roe", "debt_to_equity", "trailing_eps",
+        "book_value", "sector", "industry", "company_name",
+    ]
+    assert summary["trailing_pe"] == 10.0
+    assert summary["sector"] == "Tech"
+
+
+@patch("scripts.scanner.data_fetcher.yf.Ticker")
+def test_batch_fetch_interrupt_cancels_pending(mock_ticker_cls):
+    """主執行緒中斷時取消佇列中的抓取，不會把剩餘清單全部抓完。"""
+    mock_ticker_cls.return_value.info = _mock_info()
+
+    def _interrupt(cur, total):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        fetch_batch_metrics(
+            [f"T{i}" for i in range(50)],
+            delay_between=0.01,
+            progress_callback=_interrupt,
+            use_cache=False,
+            max_workers=1,
+        )
+
+    assert mock_ticker_cls.call_count < 50
@@ -0,0 +1,30 @@
+"""Tests for the shared fetch rate limiter."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.scanner.rate_limiter import RateLimiter
+
+
+def test_zero_interval_does_not_block():
+    """interval <= 0 時不節流。"""
+    limiter = RateLimiter(0)
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.wait()
+    assert time.monotonic() - start < 0.1
+
+
+def test_starts_spaced_across_threads():
+    """多執行緒同時呼叫時，各次起點仍至少相隔 interval。"""
+    limiter = RateLimiter(0.02)
+
+    def _stamp(_):
+        limiter.wait()
+        return time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        stamps = sorted(executor.map(_stamp, range(6)))
+
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert min(gaps) >= 0.015
@@ -113,7 +113,7 @@ def test_dual_track_result_has_mode_field():
         passed=False,
         screening_mode="safety_only",
         metrics=TickerMetrics(symbol="MODE", trailing_eps=3.0),
-        fail_reasons=["test"],
+        fail_codes=[("SECTOR_PERCENTILE", None, None)],
     )
 
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -355,3 +355,31 @@ def test_list_deep_analysis_symbols_empty():
     with tempfile.TemporaryDirectory() as tmpdir:
         symbols = list_deep_analysis_symbols(data_dir=Path(tmpdir))
         assert symbols == []
+
+
+def test_save_writes_one_result_per_line():
+    """逐筆串流寫出合法 JSON，每筆結果各佔一行。"""
+    results = [
+        screen_ticker(TickerMetrics(
+            symbol=sym, trailing_pe=pe, peg_ratio=0.8, roe=0.20,
+            debt_to_equity=0.3, trailing_eps=5.0, book_value=30.0,
+            current_price=50.0, sector="Technology",
+        ))
+        for sym, pe in [("AAA", 10.0), ("BBB", 99.0)]
+    ]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = save_screening_results(results, output_dir=Path(tmpdir))
+        text = path.read_text()
+        loaded = json.loads(text)
+        assert [r["symbol"] for r in loaded["results"]] == ["AAA", "BBB"]
+        assert loaded["results"] == [r.to_dict() for r in results]
+        assert loaded["total_passed"] == 1
+        result_lines = [
+            line for line in text.splitlines() if line.lstrip().startswith('{"symbol"')
+        ]
+        assert len(result_lines) == 2
+        assert list(Path(tmpdir).glob("*.tmp")) == []
+
+        empty_path = save_screening_results([], tag="empty", output_dir=Path(tmpdir))
+        assert json.loads(empty_path.read_text())["results"] == []
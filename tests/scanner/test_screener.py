@@ -96,6 +96,17 @@ class TestScreenTicker:
         assert "metrics" in d
         assert d["metrics"]["trailing_pe"] == 10.0
 
+    def test_fail_codes_format_lazily(self):
+        """失敗原因以代碼保存，fail_reasons 與 JSON 輸出仍為文字。"""
+        metrics = _make_metrics(trailing_pe=20.0, roe=0.10, peg_ratio=None)
+        result = screen_ticker(metrics)
+        assert [code for code, _, _ in result.fail_codes] == [
+            "PE_HIGH", "PEG_MISSING", "ROE_LOW",
+        ]
+        expected = ["P/E 20.0 >= 15.0", "PEG ratio unavailable", "ROE 10.00% < 15%"]
+        assert result.fail_reasons == expected
+        assert result.to_dict()["fail_reasons"] == expected
+
 
 class TestScreenBatch:
     def test_sorting_order(self):
@@ -109,3 +120,36 @@ class TestScreenBatch:
         assert results[1].symbol == "FAIR"
         assert results[2].symbol == "FAIL"
         assert results[2].passed is False
+
+    def test_matches_screen_ticker(self):
+        """向量化批次結果應與逐支 screen_ticker 完全一致。"""
+        metrics_list = [
+            _make_metrics("A"),
+            _make_metrics("B", peg_ratio=None),
+            _make_metrics("C", trailing_eps=-1.0),
+            _make_metrics("D", current_price=None),
+            _make_metrics("E", roe=0.05, debt_to_equity=2.0),
+            TickerMetrics(symbol="F", fetch_error="timeout"),
+        ]
+        batch = {r.symbol: r for r in screen_batch(metrics_list)}
+        for m in metrics_list:
+            expected = screen_ticker(m)
+            actual = batch[m.symbol]
+            assert actual.passed == expected.passed
+            assert actual.fail_reasons == expected.fail_reasons
+            assert actual.graham_number == pytest.approx(expected.graham_number)
+            assert actual.margin_of_safety_pct == pytest.approx(
+                expected.margin_of_safety_pct
+            )
+
+    def test_failed_keep_input_order(self):
+        """未通過者（含資料無效）排在通過者之後，並維持輸入順序。"""
+        bad = TickerMetrics(symbol="BAD", fetch_error="timeout")
+        fail = _make_metrics("FAIL", trailing_pe=99.0)
+        results = screen_batch([bad, fail, _make_metrics("OK")])
+        assert [r.symbol for r in results] == ["OK", "BAD", "FAIL"]
+        assert results[1].fail_reasons == ["Invalid data: timeout"]
+        assert results[1].graham_number is None
+
+    def test_empty_batch(self):
+        assert screen_batch([]) == []
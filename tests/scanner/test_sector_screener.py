@@ -1,12 +1,18 @@
 """Tests for dual-track sector-relative screening engine."""
 
+import numpy as np
 import pytest
-from scripts.scanner.data_fetcher import TickerMetrics
+from scripts.scanner.data_fetcher import MetricsFrame, TickerMetrics
 from scripts.scanner.config import SectorRelativeThresholds
 from scripts.scanner.sector_screener import (
-    _compute_metric_rank,
-    _group_by_sector,
-    _apply_safety_filter,
+    _metric_ranks,
+    _percentiles_from_ranks,
+    _sector_rank_matrix,
+    _sector_indices,
+    _collect_safety_codes,
+    _format_fail_codes,
+    _safety_pass_mask,
+    _sector_pass_mask,
     screen_batch_dual_track,
 )
 
@@ -38,35 +44,104 @@ def _make_metrics(
     )
 
 
+def _brute_force_rank(value, all_values, lower_is_better):
+    """逐一比較的參考實作：嚴格更好的數量 / (N - 1)。"""
+    if lower_is_better:
+        better_count = sum(1 for v in all_values if v < value)
+    else:
+        better_count = sum(1 for v in all_values if v > value)
+    return better_count / (len(all_values) - 1)
+
+
 # === 百分位排名單元測試 ===
 
 
-class TestComputeMetricRank:
+class TestMetricRanks:
     def test_rank_lower_is_better(self):
         """最低值排名 0.0（最佳），最高值排名 1.0（最差）。"""
-        values = [5.0, 10.0, 15.0, 20.0]
-        assert _compute_metric_rank(5.0, values, lower_is_better=True) == 0.0
-        assert _compute_metric_rank(20.0, values, lower_is_better=True) == 1.0
+        ranks = _metric_ranks(np.array([5.0, 10.0, 15.0, 20.0]), lower_is_better=True)
+        assert ranks[0] == 0.0
+        assert ranks[3] == 1.0
         # 10.0: 只有 5.0 嚴格更低 → rank = 1/3 ≈ 0.333
-        assert _compute_metric_rank(10.0, values, lower_is_better=True) == pytest.approx(1 / 3)
+        assert ranks[1] == pytest.approx(1 / 3)
 
     def test_rank_higher_is_better(self):
         """ROE 越高越好：最高值排名 0.0（最佳）。"""
-        values = [0.05, 0.10, 0.15, 0.20]
-        assert _compute_metric_rank(0.20, values, lower_is_better=False) == 0.0
-        assert _compute_metric_rank(0.05, values, lower_is_better=False) == 1.0
+        ranks = _metric_ranks(np.array([0.05, 0.10, 0.15, 0.20]), lower_is_better=False)
+        assert ranks[3] == 0.0
+        assert ranks[0] == 1.0
 
     def test_rank_with_ties(self):
         """相同值的股票得到相同排名。"""
-        values = [10.0, 10.0, 10.0, 20.0]
+        ranks = _metric_ranks(np.array([10.0, 10.0, 10.0, 20.0]), lower_is_better=True)
         # 10.0: 沒有人嚴格更低 → rank 0.0
-        assert _compute_metric_rank(10.0, values, lower_is_better=True) == 0.0
+        assert ranks[:3].tolist() == [0.0, 0.0, 0.0]
         # 20.0: 3 個嚴格更低 → rank = 3/3 = 1.0
-        assert _compute_metric_rank(20.0, values, lower_is_better=True) == 1.0
+        assert ranks[3] == 1.0
+
+    def test_rank_skips_missing(self):
+        """缺值位置為 NaN，且不計入 N。"""
+        ranks = _metric_ranks(np.array([10.0, np.nan, 20.0]), lower_is_better=True)
+        assert ranks[0] == 0.0
+        assert np.isnan(ranks[1])
+        assert ranks[2] == 1.0
 
     def test_rank_single_element(self):
-        """只有 1 支股票時排名為 0.0。"""
-        assert _compute_metric_rank(10.0, [10.0], lower_is_better=True) == 0.0
+        """有效值不足 2 個時無法排名，回傳 NaN（百分位為 None）。"""
+        assert np.isnan(_metric_ranks(np.array([10.0]), lower_is_better=True)).all()
+        ranks = _metric_ranks(np.array([10.0, np.nan]), lower_is_better=True)
+        assert np.isnan(ranks).all()
+
+    def test_sector_percentiles_match_brute_force(self):
+        """產業排名矩陣轉成的百分位與逐一比較的結果一致（含缺值與同值）。"""
+        pes = [10.0, None, 10.0, 25.0, 7.5]
+        roes = [0.10, 0.20, None, 0.20, 0.05]
+        group = [
+            _make_metrics(f"S{i}", trailing_pe=pe, roe=roe, peg_ratio=None)
+            for i, (pe, roe) in enumerate(zip(pes, roes))
+        ]
+        rank_matrix = _sector_rank_matrix(MetricsFrame.from_metrics(group))
+        assert rank_matrix.shape == (4, 5)
+        ranks = _percentiles_from_ranks(group, rank_matrix)
+
+        pe_values = [v for v in pes if v is not None]
+        roe_values = [v for v in roes if v is not None]
+        for pct, pe, roe in zip(ranks, pes, roes):
+            expected_pe = (
+                None if pe is None
+                else _brute_force_rank(pe, pe_values, lower_is_better=True)
+            )
+            expected_roe = (
+                None if roe is None
+                else _brute_force_rank(roe, roe_values, lower_is_better=False)
+            )
+            assert pct.pe_percentile == expected_pe
+            assert pct.roe_percentile == expected_roe
+            # PEG 全部缺值 → 無百分位
+            assert pct.peg_percentile is None
+            assert pct.sector_count == 5
+
+    def test_rank_matches_brute_force_random(self):
+        """大量含同值的隨機資料，排序法與兩兩比較結果一致。"""
+        rng = np.random.default_rng(0)
+        values = rng.integers(0, 40, size=300).astype(float).tolist()
+        for lower_is_better in (True, False):
+            ranks = _metric_ranks(np.array(values), lower_is_better)
+            expected = [_brute_force_rank(v, values, lower_is_better) for v in values]
+            assert ranks.tolist() == expected
+
+    def test_sector_pass_mask(self):
+        """全部非缺值百分位 <= 門檻且至少一個有值才通過。"""
+        nan = np.nan
+        rank_matrix = np.array([
+            # 全部通過 / 含缺值通過 / 一項超標 / 全部缺值 / 恰等於門檻
+            [0.1, nan, 0.1, nan, 0.3],
+            [0.2, 0.0, 0.5, nan, 0.3],
+            [0.0, nan, 0.0, nan, 0.3],
+            [0.3, nan, 0.0, nan, 0.3],
+        ])
+        mask = _sector_pass_mask(rank_matrix, threshold=0.30)
+        assert mask.tolist() == [True, True, False, False, True]
 
 
 # === 產業分組測試 ===
@@ -82,10 +157,10 @@ class TestGroupBySector:
             _make_metrics("D", sector="Financials"),
             _make_metrics("E", sector="Financials"),
         ]
-        groups = _group_by_sector(metrics_list)
+        groups = _sector_indices(metrics_list)
         assert len(groups) == 2
-        assert len(groups["Technology"]) == 3
-        assert len(groups["Financials"]) == 2
+        assert groups["Technology"].tolist() == [0, 1, 2]
+        assert groups["Financials"].tolist() == [3, 4]
 
     def test_group_none_sector(self):
         """sector=None 歸入 'Unknown' 群組。"""
@@ -93,9 +168,9 @@ class TestGroupBySector:
             _make_metrics("A", sector=None),
             _make_metrics("B", sector="Technology"),
         ]
-        groups = _group_by_sector(metrics_list)
+        groups = _sector_indices(metrics_list)
         assert "Unknown" in groups
-        assert len(groups["Unknown"]) == 1
+        assert groups["Unknown"].tolist() == [0]
 
 
 # === 安全底線測試 ===
@@ -105,23 +180,34 @@ class TestSafetyFilter:
     def test_safety_passes_normal(self):
         """正常範圍內的指標通過安全底線。"""
         m = _make_metrics(trailing_pe=25.0, roe=0.10, debt_to_equity=1.5, peg_ratio=2.0)
-        passed, reasons = _apply_safety_filter(m)
-        assert passed is True
-        assert len(reasons) == 0
+        assert _collect_safety_codes(m) == []
 
     def test_safety_fails_extreme_pe(self):
         """P/E 超過安全上限 → 失敗。"""
         m = _make_metrics(trailing_pe=60.0)
-        passed, reasons = _apply_safety_filter(m)
-        assert passed is False
-        assert any("P/E" in r for r in reasons)
+        codes = _collect_safety_codes(m)
+        assert codes == [("SAFETY_PE", 60.0, 50.0)]
+        assert _format_fail_codes(codes) == ["P/E 60.0 >= 安全上限 50.0"]
 
     def test_safety_missing_data_passes(self):
         """缺失資料不導致安全底線失敗（只過濾極端值）。"""
         m = _make_metrics(trailing_pe=None, peg_ratio=None, roe=None, debt_to_equity=None)
-        passed, reasons = _apply_safety_filter(m)
-        assert passed is True
-        assert len(reasons) == 0
+        assert _collect_safety_codes(m) == []
+
+    def test_safety_mask_matches_scalar_filter(self):
+        """向量化安全底線遮罩與逐股 _collect_safety_codes 判定一致。"""
+        group = [
+            _make_metrics("OK"),
+            _make_metrics("PE", trailing_pe=50.0),
+            _make_metrics("PEG", peg_ratio=3.5),
+            _make_metrics("ROE", roe=0.01),
+            _make_metrics("DE", debt_to_equity=2.0),
+            _make_metrics("DE2", debt_to_equity=2.1),
+            _make_metrics("NONE", trailing_pe=None, peg_ratio=None, roe=None,
+                          debt_to_equity=None),
+        ]
+        mask = _safety_pass_mask(MetricsFrame.from_metrics(group))
+        assert mask.tolist() == [not _collect_safety_codes(m) for m in group]
 
 
 # === 雙軌整合測試 ===
@@ -184,6 +270,9 @@ class TestDualTrackIntegration:
         bad_result = next(r for r in results if r.symbol == "BAD0")
         assert bad_result.passed is False
         assert bad_result.passed_safety_filter is False
+        assert bad_result.safety_fail_codes == [("SAFETY_ROE", 0.02, 0.05)]
+        assert bad_result.safety_fail_reasons == ["ROE 2.00% < 安全下限 5%"]
+        assert bad_result.fail_reasons[-1] == "ROE 2.00% < 安全下限 5%"
 
     def test_small_sector_fallback(self):
         """產業 < min_sector_size 時僅用安全底線篩選。"""
@@ -193,6 +282,9 @@ class TestDualTrackIntegration:
         results = screen_batch_dual_track(batch, thresholds)
         for r in results:
             assert r.screening_mode == "safety_only"
+            assert r.sector_percentiles.pe_percentile is None
+            assert r.sector_percentiles.sector == "RealEstate"
+            assert r.sector_percentiles.sector_count == 3
 
 
 # === 批次處理測試 ===
@@ -253,3 +345,20 @@ class TestBatchDualTrack:
         assert "de_percentile" in sp
         assert "sector" in sp
         assert "sector_count" in sp
+
+
+def test_format_fail_codes_distinguishes_int_and_float_limit():
+    """門檻 50 與 50.0 顯示不同，樣板快取不可混用。"""
+    assert _format_fail_codes([("SAFETY_PE", 60.0, 50)]) == [
+        "P/E 60.0 >= 安全上限 50"
+    ]
+    assert _format_fail_codes([("SAFETY_PE", 60.0, 50.0)]) == [
+        "P/E 60.0 >= 安全上限 50.0"
+    ]
+
+
+def test_results_use_slots():
+    """每支股票各一份的結果物件不帶 __dict__，降低大批次的記憶體用量。"""
+    (result,) = screen_batch_dual_track([_make_metrics("A")])
+    assert not hasattr(result, "__dict__")
+    assert not hasattr(result.sector_percentiles, "__dict__")
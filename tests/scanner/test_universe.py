@@ -1,6 +1,7 @@
 """Tests for stock universe providers."""
 
 import json
+import os
 import tempfile
 from pathlib import Path
 from unittest.mock import patch, MagicMock
@@ -9,7 +10,9 @@ import pytest
 
 from scripts.scanner.universe import (
     get_tickers_from_file,
+    _dump_ticker_list,
     _fetch_wikipedia_tickers,
+    _parse_symbol_column,
     get_sp400_tickers,
     get_sp600_tickers,
     get_sp1500_tickers,
@@ -50,7 +53,9 @@ _MOCK_HTML_TABLE = """
 def test_fetch_helper_parses_wikipedia_table(mock_get, tmp_path):
     """_fetch_wikipedia_tickers 正確解析 Wikipedia HTML 表格並正規化代碼。"""
     mock_resp = MagicMock()
+    mock_resp.status_code = 200
     mock_resp.text = _MOCK_HTML_TABLE
+    mock_resp.headers = {"ETag": '"abc123"'}
     mock_resp.raise_for_status = MagicMock()
     mock_get.return_value = mock_resp
 
@@ -73,6 +78,67 @@ def test_fetch_helper_parses_wikipedia_table(mock_get, tmp_path):
     assert cache_path.exists()
     cached = json.loads(cache_path.read_text())
     assert cached == result
+    assert (tmp_path / "test_cache.etag").read_text() == '"abc123"'
+
+
+@patch("scripts.scanner.universe.requests.get")
+def test_fetch_helper_reuses_cache_on_304(mock_get, tmp_path):
+    """強制更新時帶上 ETag；頁面未變動（304）則沿用快取，不解析 HTML。"""
+    cache_path = tmp_path / "test_cache.json"
+    cache_path.write_text(json.dumps(["AAPL", "MSFT"]))
+    (tmp_path / "test_cache.etag").write_text('"abc123"')
+
+    mock_resp = MagicMock()
+    mock_resp.status_code = 304
+    mock_get.return_value = mock_resp
+
+    result = _fetch_wikipedia_tickers(
+        url="https://example.com",
+        cache_path=cache_path,
+        label="Test",
+        use_cache=False,
+    )
+
+    assert result == ["AAPL", "MSFT"]
+    sent_headers = mock_get.call_args.kwargs["headers"]
+    assert sent_headers["If-None-Match"] == '"abc123"'
+    mock_resp.raise_for_status.assert_not_called()
+
+
+def test_dump_ticker_list_matches_json_dump():
+    """快取序列化結果與 json.dumps(indent=2) 逐字相同。"""
+    for tickers in ([], ["AAPL"], ["AAPL", "BRK-B", 'A"B']):
+        assert _dump_ticker_list(tickers) == json.dumps(tickers, indent=2)
+
+
+def test_parse_symbol_column_finds_header_and_links():
+    """Symbol 欄位不在第一欄、代碼包在連結內時仍能正確取出，且只讀第一個表格。"""
+    html = """
+    <html><body>
+    <table class="wikitable">
+    <thead><tr><th>Security</th><th>Symbol</th></tr></thead>
+    <tbody>
+    <tr><td>Apple</td><td><a href="/AAPL">AAPL</a></td></tr>
+    <tr><td>Berkshire</td><td><a href="/BRK">BRK.B</a>\n</td></tr>
+    </tbody>
+    </table>
+    <table><tr><th>Symbol</th></tr><tr><td>OLD</td></tr></table>
+    </body></html>
+    """
+    assert _parse_symbol_column(html) == ["AAPL", "BRK.B"]
+
+
+def test_parse_symbol_column_missing_column():
+    """第一個表格沒有 Symbol 欄位時拋出 ValueError。"""
+    html = "<table><tr><th>Name</th></tr><tr><td>X</td></tr></table>"
+    with pytest.raises(ValueError):
+        _parse_symbol_column(html)
+
+
+def test_parse_symbol_column_empty_table():
+    """第一個表格沒有任何列時拋出 ValueError，而非 IndexError。"""
+    with pytest.raises(ValueError):
+        _parse_symbol_column("<table></table>")
 
 
 @patch("scripts.scanner.universe.requests.get")
@@ -103,6 +169,41 @@ def test_sp600_tickers_cached(mock_get, tmp_path):
     mock_get.assert_not_called()
 
 
+@patch("scripts.scanner.universe.requests.get")
+def test_tickers_memoized_in_process(mock_get, tmp_path):
+    """同一清單在行程內只讀取一次檔案，回傳的列表可安全修改。"""
+    cache_path = tmp_path / "sp400_tickers.json"
+    cache_path.write_text(json.dumps(["MDT", "NDAQ"]))
+
+    with (
+        patch("scripts.scanner.universe._SP400_CACHE", cache_path),
+        patch("scripts.scanner.universe.json.load", wraps=json.load) as mock_load,
+    ):
+        first = get_sp400_tickers()
+        first.append("MUTATED")
+        second = get_sp400_tickers()
+
+    assert second == ["MDT", "NDAQ"]
+    assert mock_load.call_count == 1
+    mock_get.assert_not_called()
+
+
+@patch("scripts.scanner.universe.requests.get")
+def test_memoized_tickers_reload_after_cache_file_changes(mock_get, tmp_path):
+    """快取檔被更新（mtime 改變）後，記憶化的舊清單失效並重新讀取。"""
+    cache_path = tmp_path / "sp400_tickers.json"
+    cache_path.write_text(json.dumps(["MDT", "NDAQ"]))
+    os.utime(cache_path, ns=(1_000_000_000, 1_000_000_000))
+
+    with patch("scripts.scanner.universe._SP400_CACHE", cache_path):
+        assert get_sp400_tickers() == ["MDT", "NDAQ"]
+        cache_path.write_text(json.dumps(["CHANGED"]))
+        os.utime(cache_path, ns=(2_000_000_000, 2_000_000_000))
+        assert get_sp400_tickers() == ["CHANGED"]
+
+    mock_get.assert_not_called()
+
+
 def test_sp1500_deduplication():
     """sp1500 應去除重複的股票代碼。"""
     with (
@@ -147,3 +248,24 @@ def test_sp1500_combines_all_three():
         result = get_sp1500_tickers()
 
     assert result == ["A", "B", "C", "D", "E", "F"]
+
+
+def test_sp1500_merges_sorted_lists():
+    """已排序的子清單合併後仍為排序、去重複的聯集。"""
+    with (
+        patch(
+            "scripts.scanner.universe.get_sp500_tickers",
+            return_value=["AAPL", "BRK-B", "MSFT"],
+        ),
+        patch(
+            "scripts.scanner.universe.get_sp400_tickers",
+            return_value=["BRK-B", "MDT", "ZION"],
+        ),
+        patch(
+            "scripts.scanner.universe.get_sp600_tickers",
+            return_value=["AAPL", "CALM", "MSFT"],
+        ),
+    ):
+        result = get_sp1500_tickers()
+
+    assert result == ["AAPL", "BRK-B", "CALM", "MDT", "MSFT", "ZION"]